@@ -3,11 +3,34 @@ import tkinter as tk
 from tkinter import ttk
 from tkinter import filedialog, messagebox
 import os
-import hashlib
+import queue
+import logging
 import threading
 import time
-# --- For Icon ---
-from PIL import Image # Make sure Pillow is installed: pip install Pillow
+# --- Scan Engine (no GUI imports; also used by `python -m duplicate_detective`) ---
+from duplicate_detective.engine import (
+    DEFAULT_INDEX_PATH, DIGEST_BACKEND, DIGEST_BACKENDS, DuplicateScanner, HashIndex, HashingEngine, ScanCancelled,
+    format_size, format_stage_stats, normalize_roots, parse_globs, parse_size,
+)
+from duplicate_detective.metrics import PROFILE_PATH, REPORT_PATH, profiled, write_report
+from duplicate_detective.perceptual import NEAR_DUPLICATE_THRESHOLD, available as perceptual_available
+from duplicate_detective.reclaim import ACTIONS, Reclaimer, latest_journal, undo_journal
+
+# Messages go to the console through logging; set DUPLICATE_DETECTIVE_REPORT / _PROFILE for a
+# JSON report of each scan's phase timings and counters / a cProfile dump of the scan thread.
+log = logging.getLogger("duplicate_detective.gui")
+
+# --- Results View Settings ---
+RESULTS_PAGE_SIZE = 500 # Duplicate groups shown per page; only the visible page exists in the Treeview
+UI_BATCH_GROUPS = 200 # Max groups moved from the scan queue into the view per UI tick
+UI_POLL_MS = 50 # How often the UI checks the scan queue and progress
+
+# --- Clean-up Actions: (menu label, reclaim action, button text) ---
+RECLAIM_ACTIONS = [entry for entry in [
+    ("Delete", "delete", "Delete Selected"), ("Send to Trash", "trash", "Trash Selected"),
+    ("Move to Quarantine", "quarantine", "Quarantine Selected"), ("Replace with Hard Link", "hardlink", "Hard-Link Selected"),
+    ("Replace with Reflink", "reflink", "Reflink Selected"),
+] if entry[1] in ACTIONS]
 
 # --- Main Application Class ---
 class DuplicateDetectorApp:
@@ -17,8 +40,27 @@ class DuplicateDetectorApp:
         self.root.geometry("1050x700")
 
         # --- Core Variables ---
-        self.folders_to_scan = []
+        self.folders_to_scan = [] # scanned together as one set; nested/repeated folders are dropped when added
         self.duplicates_data = {}
+        self.scan_stats = {}
+        self.index_path = DEFAULT_INDEX_PATH
+        self.scanned_files = {}
+        self.hardlinks = {}
+        self.scanner = DuplicateScanner(index_path=self.index_path)
+        self.scan_queue = queue.Queue() # scan thread -> UI: ("group", (digest, size, paths)) then one ("done" | "cancelled" | "error", payload)
+        self.scan_progress = None # latest (phase, files_done, files_total, bytes_done, bytes_total) from the scan thread
+        self.progress_phase = None; self.phase_started = 0.0
+        self.scan_running = False
+        self.reclaim_running = False # a clean-up or an undo is running
+        self.reclaimer = None # the running clean-up (delete/link/quarantine), if any
+        self.reclaim_queue = queue.Queue() # clean-up thread -> UI: ("batch", progress state) then one ("done" | "undone" | "error", payload)
+        self.reclaim_state = None # (action, files_done, files_total, bytes_freed, errors) while a clean-up runs
+
+        # --- Results Model (the Treeview only ever shows one page of it) ---
+        self.result_groups = [] # [(digest, size, paths)] in display order; similar-image groups have a {path: size} dict as size
+        self.marked_paths = set() # selected files across all pages
+        self.visible_items = {} # Treeview item id -> path, current page only
+        self.results_page = 0
 
         # --- Font Setup ---
         self._setup_fonts() # Call the font setup method
@@ -40,8 +82,8 @@ class DuplicateDetectorApp:
             available_fonts = ctk.utility.font.families()
             if "Segoe UI" in available_fonts: app_font_family = "Segoe UI"
             elif "Roboto" in available_fonts: app_font_family = "Roboto"
-        except Exception as e: print(f"Error getting font families: {e}")
-        print(f"Using font family: {app_font_family}")
+        except Exception as e: log.warning(f"Error getting font families: {e}")
+        log.debug(f"Using font family: {app_font_family}")
 
         self.sidebar_header_font = ctk.CTkFont(family=app_font_family, size=16, weight="bold")
         self.sidebar_button_font = ctk.CTkFont(family=app_font_family, size=14)
@@ -57,10 +99,11 @@ class DuplicateDetectorApp:
         """Loads icon safely."""
         if os.path.exists(icon_path):
             try:
+                from PIL import Image # Make sure Pillow is installed: pip install Pillow
                 pil_image = Image.open(icon_path)
                 return ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=size)
-            except Exception as e: print(f"Error loading icon '{icon_path}': {e}")
-        else: print(f"Icon file not found: {icon_path}")
+            except Exception as e: log.warning(f"Error loading icon '{icon_path}': {e}")
+        else: log.warning(f"Icon file not found: {icon_path}")
         return None
 
     def _setup_ui(self):
@@ -74,17 +117,36 @@ class DuplicateDetectorApp:
         sidebar_frame.grid_columnconfigure(0, weight=1)
         sidebar_frame.grid_rowconfigure(3, weight=1)
 
-        folders_label = ctk.CTkLabel(master=sidebar_frame, text="Selected Folder", font=self.sidebar_header_font, anchor="w")
+        folders_label = ctk.CTkLabel(master=sidebar_frame, text="Selected Folders", font=self.sidebar_header_font, anchor="w")
         folders_label.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="new")
         icon_image = self._load_icon()
-        add_folder_btn = ctk.CTkButton(master=sidebar_frame, text="Select Folder", image=icon_image, compound="left", command=self.add_folder_clicked, font=self.sidebar_button_font, corner_radius=6, anchor="w", border_spacing=10)
-        add_folder_btn.grid(row=1, column=0, padx=15, pady=(5,10), sticky="new")
+        folder_buttons_frame = ctk.CTkFrame(master=sidebar_frame, fg_color="transparent")
+        folder_buttons_frame.grid(row=1, column=0, padx=15, pady=(5,10), sticky="new")
+        folder_buttons_frame.grid_columnconfigure(0, weight=1)
+        add_folder_btn = ctk.CTkButton(master=folder_buttons_frame, text="Add Folder", image=icon_image, compound="left", command=self.add_folder_clicked, font=self.sidebar_button_font, corner_radius=6, anchor="w", border_spacing=10)
+        add_folder_btn.grid(row=0, column=0, sticky="new")
+        clear_folders_btn = ctk.CTkButton(master=folder_buttons_frame, text="Clear", width=60, command=self.clear_folders_clicked, font=self.sidebar_button_font, corner_radius=6, fg_color="gray40", hover_color="gray30")
+        clear_folders_btn.grid(row=0, column=1, padx=(8, 0), sticky="nse")
         folder_list_frame = ctk.CTkFrame(master=sidebar_frame, corner_radius=4)
         folder_list_frame.grid(row=2, column=0, padx=15, pady=5, sticky="nsew")
         self.folder_list_textbox = ctk.CTkTextbox(master=folder_list_frame, font=self.folder_list_font, wrap="none", activate_scrollbars=True, border_width=0, fg_color="transparent")
         self.folder_list_textbox.pack(expand=True, fill="both", padx=5, pady=5)
         self.folder_list_textbox.insert("0.0", "No folder selected...")
         self.folder_list_textbox.configure(state="disabled")
+        options_frame = ctk.CTkFrame(master=sidebar_frame, fg_color="transparent")
+        options_frame.grid(row=3, column=0, padx=15, pady=(10, 0), sticky="sew")
+        options_frame.grid_columnconfigure((0, 1), weight=1)
+        index_location_btn = ctk.CTkButton(master=options_frame, text="Index Location...", command=self.choose_index_location_clicked, font=self.switch_font, corner_radius=6); index_location_btn.grid(row=0, column=0, padx=(0, 5), sticky="ew")
+        prune_index_btn = ctk.CTkButton(master=options_frame, text="Prune Index", command=self.prune_index_clicked, font=self.switch_font, corner_radius=6); prune_index_btn.grid(row=0, column=1, padx=(5, 0), sticky="ew")
+        digest_label = ctk.CTkLabel(master=options_frame, text="Hash Algorithm", font=self.switch_font, anchor="w"); digest_label.grid(row=1, column=0, pady=(10, 0), sticky="w")
+        self.digest_backend_menu = ctk.CTkOptionMenu(master=options_frame, values=list(DIGEST_BACKENDS), font=self.switch_font, corner_radius=6); self.digest_backend_menu.set(DIGEST_BACKEND); self.digest_backend_menu.grid(row=1, column=1, padx=(5, 0), pady=(10, 0), sticky="ew")
+        filters_label = ctk.CTkLabel(master=options_frame, text="Filters", font=self.sidebar_header_font, anchor="w"); filters_label.grid(row=2, column=0, columnspan=2, pady=(15, 5), sticky="w")
+        self.include_entry = ctk.CTkEntry(master=options_frame, placeholder_text="Only: *.package, *.ts4script", font=self.switch_font); self.include_entry.grid(row=3, column=0, columnspan=2, pady=(0, 5), sticky="ew")
+        self.exclude_entry = ctk.CTkEntry(master=options_frame, placeholder_text="Skip: Cache, *.log", font=self.switch_font); self.exclude_entry.grid(row=4, column=0, columnspan=2, pady=(0, 5), sticky="ew")
+        self.min_size_entry = ctk.CTkEntry(master=options_frame, placeholder_text="Min size (e.g. 1 KB)", font=self.switch_font); self.min_size_entry.grid(row=5, column=0, padx=(0, 5), sticky="ew")
+        self.max_size_entry = ctk.CTkEntry(master=options_frame, placeholder_text="Max size (e.g. 2 GB)", font=self.switch_font); self.max_size_entry.grid(row=5, column=1, padx=(5, 0), sticky="ew")
+        self.similar_images_check = ctk.CTkCheckBox(master=options_frame, text="Also find similar images", font=self.switch_font); self.similar_images_check.grid(row=6, column=0, columnspan=2, pady=(10, 0), sticky="w")
+        if not perceptual_available(): self.similar_images_check.configure(state="disabled", text="Similar images (needs Pillow)")
         self.theme_switch = ctk.CTkSwitch(master=sidebar_frame, text="Dark Mode", command=self.toggle_theme, font=self.switch_font)
         self.theme_switch.grid(row=4, column=0, padx=20, pady=20, sticky="sw")
 
@@ -98,11 +160,13 @@ class DuplicateDetectorApp:
         top_main_frame.grid_columnconfigure(0, weight=1)
         title_label = ctk.CTkLabel(master=top_main_frame, text="Duplicate Detective", font=self.main_title_font, anchor="w")
         title_label.grid(row=0, column=0, sticky="nw")
-        subtitle_label = ctk.CTkLabel(master=top_main_frame, text="Scan the selected folder for duplicate files and delete them.", font=self.subtitle_font, text_color="gray50", anchor="w")
+        subtitle_label = ctk.CTkLabel(master=top_main_frame, text="Scan the selected folders for duplicate files and delete them.", font=self.subtitle_font, text_color="gray50", anchor="w")
         subtitle_label.grid(row=1, column=0, pady=(2, 15), sticky="nw")
-        self.scan_btn = ctk.CTkButton(master=top_main_frame, text="Scan Selected Folder", command=self.scan_folders_clicked, font=self.scan_button_font, corner_radius=8)
+        self.scan_btn = ctk.CTkButton(master=top_main_frame, text="Scan Selected Folders", command=self.scan_folders_clicked, font=self.scan_button_font, corner_radius=8)
         self.scan_btn.grid(row=2, column=0, pady=10, sticky="nw")
-        self.progress_bar = ctk.CTkProgressBar(master=top_main_frame, orientation="horizontal", mode="indeterminate", height=8, corner_radius=4)
+        self.cancel_btn = ctk.CTkButton(master=top_main_frame, text="Cancel Scan", command=self.cancel_scan_clicked, font=self.sidebar_button_font, corner_radius=8, fg_color="gray40", hover_color="gray30")
+        self.progress_bar = ctk.CTkProgressBar(master=top_main_frame, orientation="horizontal", mode="determinate", height=8, corner_radius=4)
+        self.progress_label = ctk.CTkLabel(master=top_main_frame, text="", font=self.switch_font, text_color="gray50", anchor="w")
 
         tree_frame = ctk.CTkFrame(master=main_frame, fg_color="transparent")
         tree_frame.grid(row=2, column=0, pady=(15, 10), sticky="nsew")
@@ -114,19 +178,28 @@ class DuplicateDetectorApp:
         self.results_tree.column('#0', stretch=tk.YES, minwidth=200, width=250, anchor='w'); self.results_tree.column('folder_path', stretch=tk.YES, minwidth=300, width=400, anchor='w'); self.results_tree.column('size', stretch=tk.NO, minwidth=80, width=100, anchor='e')
         self.results_tree.grid(row=0, column=0, sticky='nsew')
         tree_scrollbar = ctk.CTkScrollbar(master=tree_frame, command=self.results_tree.yview, corner_radius=6); tree_scrollbar.grid(row=0, column=1, sticky='ns'); self.results_tree.configure(yscrollcommand=tree_scrollbar.set)
+        self.results_tree.bind("<<TreeviewSelect>>", self._on_tree_select)
 
         bottom_frame = ctk.CTkFrame(master=main_frame, fg_color="transparent")
         bottom_frame.grid(row=3, column=0, sticky="nsew")
-        bottom_frame.grid_columnconfigure(0, weight=1)
-        select_dupes_btn = ctk.CTkButton(master=bottom_frame, text="Select Dupes (Keep First)", command=self.select_all_but_first, font=self.sidebar_button_font, corner_radius=6); select_dupes_btn.grid(row=0, column=0, padx=(0,10), pady=10, sticky="se")
-        delete_btn = ctk.CTkButton(master=bottom_frame, text="Delete Selected", command=self.delete_selected_clicked, font=self.sidebar_button_font, corner_radius=6, fg_color="#D32F2F", hover_color="#B71C1C"); delete_btn.grid(row=0, column=1, padx=0, pady=10, sticky="se")
+        bottom_frame.grid_columnconfigure(1, weight=1)
+        page_frame = ctk.CTkFrame(master=bottom_frame, fg_color="transparent"); page_frame.grid(row=0, column=0, pady=10, sticky="sw")
+        self.prev_page_btn = ctk.CTkButton(master=page_frame, text="◀", width=32, command=lambda: self.change_page(-1), font=self.sidebar_button_font, corner_radius=6); self.prev_page_btn.grid(row=0, column=0)
+        self.page_label = ctk.CTkLabel(master=page_frame, text="", font=self.switch_font); self.page_label.grid(row=0, column=1, padx=10)
+        self.next_page_btn = ctk.CTkButton(master=page_frame, text="▶", width=32, command=lambda: self.change_page(1), font=self.sidebar_button_font, corner_radius=6); self.next_page_btn.grid(row=0, column=2)
+        select_dupes_btn = ctk.CTkButton(master=bottom_frame, text="Select Dupes (Keep First)", command=self.select_all_but_first, font=self.sidebar_button_font, corner_radius=6); select_dupes_btn.grid(row=0, column=1, padx=(0,10), pady=10, sticky="se")
+        self.undo_btn = ctk.CTkButton(master=bottom_frame, text="Undo Last Clean-up", command=self.undo_last_clicked, font=self.sidebar_button_font, corner_radius=6, fg_color="gray40", hover_color="gray30"); self.undo_btn.grid(row=0, column=2, padx=(0,10), pady=10, sticky="se")
+        self.reclaim_action_menu = ctk.CTkOptionMenu(master=bottom_frame, values=[label for label, _, _ in RECLAIM_ACTIONS], command=self._on_reclaim_action_changed, font=self.sidebar_button_font, width=190)
+        self.reclaim_action_menu.set(RECLAIM_ACTIONS[0][0]); self.reclaim_action_menu.grid(row=0, column=3, padx=(0,10), pady=10, sticky="se")
+        self.delete_btn = ctk.CTkButton(master=bottom_frame, text=RECLAIM_ACTIONS[0][2], command=self.delete_selected_clicked, font=self.sidebar_button_font, corner_radius=6, fg_color="#D32F2F", hover_color="#B71C1C"); self.delete_btn.grid(row=0, column=4, padx=0, pady=10, sticky="se")
+        self._update_page_controls()
 
     # --- Theme and Style Methods ---
     def toggle_theme(self):
         current_mode = ctk.get_appearance_mode()
         new_mode = "dark" if current_mode == "Light" else "light"
         ctk.set_appearance_mode(new_mode)
-        print(f"Switched theme to: {new_mode}")
+        log.info(f"Switched theme to: {new_mode}")
         self._apply_ttk_style(new_mode)
 
     def _apply_ttk_style(self, mode):
@@ -134,180 +207,364 @@ class DuplicateDetectorApp:
         else: tree_bg,tree_fg,heading_bg,heading_fg,selected_bg=("#2B2B2B","#DCE4EE","#303030","#DCE4EE","#005A9E")
         self.style.configure("Treeview", background=tree_bg, foreground=tree_fg, fieldbackground=tree_bg, font=self.tree_body_font, rowheight=25, borderwidth=0); self.style.map('Treeview', background=[('selected', selected_bg)])
         self.style.configure("Treeview.Heading", background=heading_bg, foreground=heading_fg, font=self.tree_heading_font, padding=(8, 5), relief="flat", borderwidth=0); self.style.map("Treeview.Heading", background=[('active', heading_bg)], relief=[('active','flat'),('!active','flat')])
-        print(f"Applied ttk Treeview style for {mode} theme.")
+        log.debug(f"Applied ttk Treeview style for {mode} theme.")
 
     def _apply_initial_theme(self):
         initial_mode = ctk.get_appearance_mode()
-        print(f"Initial appearance mode: {initial_mode}")
+        log.info(f"Initial appearance mode: {initial_mode}")
         if initial_mode == "Dark": self.theme_switch.select()
         else: self.theme_switch.deselect()
         self._apply_ttk_style(initial_mode)
 
     # --- Backend Logic Methods ---
-    def get_file_hash(self, file_path):
-        hash_md5 = hashlib.md5()
-        try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
-        except Exception as e:
-            print(f"Error hashing {file_path}: {e}")
-            return None
-
-    def get_file_size(self, file_path):
-        try:
-            size_bytes = os.path.getsize(file_path)
-            if size_bytes < 1024: return f"{size_bytes} B"
-            elif size_bytes < 1024**2: return f"{size_bytes/1024:.1f} KB"
-            elif size_bytes < 1024**3: return f"{size_bytes/1024**2:.1f} MB"
-            else: return f"{size_bytes/1024**3:.1f} GB"
-        except Exception as e:
-            print(f"Error getting size for {file_path}: {e}")
-            return "N/A"
-
     def _run_scan_logic(self):
-        print("Scan thread started...")
-        if not self.folders_to_scan: print("No folder selected..."); self.root.after(0, lambda: messagebox.showerror("Error", "No folder selected...")); self.root.after(0, self.progress_bar.stop); self.root.after(0, lambda: self.progress_bar.grid_forget()); self.root.after(0, lambda: self.scan_btn.configure(state="normal")); return
-
-        first_path_map = {}; duplicates_found = {}; total_files_scanned = 0
+        """Runs in the scan thread. Talks to the UI only through scan_queue / scan_progress."""
+        log.debug("Scan thread started...")
         try:
-            print(f"Scanning folder: {self.folders_to_scan[0]}")
-            folder = self.folders_to_scan[0]
-            if not os.path.isdir(folder): print(f"Invalid folder selected: {folder}"); raise ValueError("Invalid folder selected")
-            normalized_folder = os.path.realpath(os.path.normpath(folder)); print(f"Processing: {normalized_folder}")
-            for dirpath, _, filenames in os.walk(normalized_folder):
-                for fname in filenames:
-                    fpath = os.path.join(dirpath, fname); normalized_fpath = os.path.normpath(fpath)
-                    if not os.path.isfile(normalized_fpath) or os.path.islink(normalized_fpath): continue
-                    file_hash = self.get_file_hash(normalized_fpath); total_files_scanned += 1
-                    if not file_hash: print(f"Skip hash error: {normalized_fpath}"); continue
-                    if file_hash in first_path_map:
-                        original_path = first_path_map[file_hash]
-                        if normalized_fpath == os.path.normpath(original_path): continue
-                        if file_hash not in duplicates_found:
-                            duplicates_found[file_hash] = [original_path]; # print(f" New set: {os.path.basename(original_path)}")
-                        if normalized_fpath not in duplicates_found[file_hash]:
-                            duplicates_found[file_hash].append(normalized_fpath); # print(f"  +Dupe: {os.path.basename(normalized_fpath)}")
-                    else: first_path_map[file_hash] = normalized_fpath
-            self.duplicates_data = duplicates_found
-            num_duplicate_files = sum(len(paths) - 1 for paths in self.duplicates_data.values()); num_sets = len(self.duplicates_data)
-            print(f"Scan complete. Found {num_sets} sets ({num_duplicate_files} extra files). Scanned: {total_files_scanned}")
-            self.root.after(0, self._update_treeview)
-            if num_sets > 0: self.root.after(100, lambda: messagebox.showinfo("Scan Complete", f"Found {num_sets} sets ({num_duplicate_files} duplicate files)."))
-            else: self.root.after(100, lambda: messagebox.showinfo("Scan Complete", "No duplicate files found."))
-        except Exception as e: print(f"Error during scan: {e}"); self.root.after(0, lambda: messagebox.showerror("Scan Error", f"Error during scan:\n{e}"))
+            with profiled(PROFILE_PATH):
+                result = self.scanner.scan(self.folders_to_scan, on_group=lambda digest, paths, files: self.scan_queue.put(("group", (digest, files[paths[0]].st_size, paths))),
+                                           on_similar=lambda key, paths, files: self.scan_queue.put(("group", (key, {path: files[path].st_size for path in paths}, paths))))
+            self.scan_queue.put(("done", result))
+        except ScanCancelled: log.info("Scan cancelled."); self.scan_queue.put(("cancelled", None))
+        except Exception as e: log.exception(f"Error during scan: {e}"); self.scan_queue.put(("error", e))
         finally:
-            if self.root: self.root.after(0, self.progress_bar.stop); self.root.after(0, lambda: self.progress_bar.grid_forget()); self.root.after(0, lambda: self.scan_btn.configure(state="normal"))
-            print("Scan thread finished.")
-
-    def _update_treeview(self):
-        for item in self.results_tree.get_children(): self.results_tree.delete(item)
-        if not self.duplicates_data: print("No duplicates to display."); return
-        for file_hash, paths in self.duplicates_data.items():
-            if paths and len(paths) > 1:
-                first_path = paths[0]; filename = os.path.basename(first_path); folder = os.path.dirname(first_path); size = self.get_file_size(first_path)
-                parent_id = self.results_tree.insert("", tk.END, text=f" {filename}", values=(folder, size, first_path), open=True)
-                for duplicate_path in paths[1:]:
-                    filename = os.path.basename(duplicate_path); folder = os.path.dirname(duplicate_path); size = self.get_file_size(duplicate_path)
-                    self.results_tree.insert(parent_id, tk.END, text=f" {filename}", values=(folder, size, duplicate_path))
-        print("Treeview updated with scan results.")
+            self.scanner.hash_engine.shutdown()
+            log.debug("Scan thread finished.")
+
+    def _report_progress(self, *state):
+        """Scanner progress callback (scan thread): just keep the latest state for the next UI tick."""
+        self.scan_progress = state
+
+    def _poll_scan_queue(self):
+        """UI tick while scanning: moves a bounded batch of groups into the view and refreshes progress."""
+        batch = []; finished = None
+        while len(batch) < UI_BATCH_GROUPS:
+            try: kind, payload = self.scan_queue.get_nowait()
+            except queue.Empty: break
+            if kind == "group": batch.append(payload)
+            else: finished = (kind, payload); break
+        if batch: self._append_groups(batch)
+        self._show_progress()
+        if finished: self._finish_scan(*finished)
+        else: self.root.after(UI_POLL_MS, self._poll_scan_queue)
+
+    def _show_progress(self):
+        if not self.scan_progress: return
+        phase, files_done, files_total, bytes_done, bytes_total = self.scan_progress
+        if phase != self.progress_phase: self.progress_phase = phase; self.phase_started = time.perf_counter()
+        if phase == "walk":
+            self.progress_bar.set(0); self.progress_label.configure(text=f"Finding files: {files_done:,} files, {format_size(bytes_done)}"); return
+        elapsed = time.perf_counter() - self.phase_started
+        rate = f" · {format_size(int(bytes_done / elapsed))}/s" if elapsed > 0.5 else ""
+        label = {"partial": "Quick check (file starts/ends)", "full": "Comparing contents", "images": "Comparing images"}[phase]
+        self.progress_bar.set(files_done / files_total if files_total else 1)
+        self.progress_label.configure(text=f"{label}: {files_done:,} / {files_total:,} files · {format_size(bytes_done)} / {format_size(bytes_total)}{rate}")
+
+    def _show_progress_controls(self, cancel_text):
+        self.cancel_btn.configure(state="normal", text=cancel_text); self.cancel_btn.grid(row=2, column=0, pady=10, sticky="ne")
+        self.progress_bar.set(0); self.progress_bar.grid(row=3, column=0, padx=0, pady=(10, 0), sticky="ew")
+        self.progress_label.configure(text="Starting..."); self.progress_label.grid(row=4, column=0, pady=(2, 0), sticky="ew")
+
+    def _hide_progress_controls(self):
+        self.progress_bar.grid_forget(); self.progress_label.grid_forget(); self.cancel_btn.grid_forget()
+
+    def _finish_scan(self, kind, payload):
+        self._hide_progress_controls(); self.scan_btn.configure(state="normal"); self.scan_running = False
+        if kind == "cancelled":
+            resume_note = "\n\nScanning the same folders again (with the same filters) continues where this scan stopped." if self.scanner.index_path else ""
+            messagebox.showinfo("Scan Cancelled", f"The scan was cancelled. {len(self.result_groups)} duplicate set(s) confirmed so far are listed.{resume_note}")
+        elif kind == "error": messagebox.showerror("Scan Error", f"Error during scan:\n{payload}")
+        else:
+            result = payload
+            self.duplicates_data, self.hardlinks, self.scanned_files, self.scan_stats = result.duplicates, result.hardlinks, result.files, result.stats
+            # Streamed groups arrive in the order they were confirmed; settle on the usual walk order.
+            # Similar-image groups go after the exact ones.
+            self.result_groups = [(digest, result.files[paths[0]].st_size, paths) for digest, paths in self.duplicates_data.items()]
+            self.result_groups += [(key, {path: result.files[path].st_size for path in paths}, paths) for key, paths in result.similar_images.items()]
+            self._render_page()
+            num_duplicate_files = sum(len(paths) - 1 for paths in self.duplicates_data.values()); num_sets = len(self.duplicates_data)
+            similar_note = f"\n{len(result.similar_images)} set(s) of similar images (marked ≈) are listed after them." if result.similar_images else ""
+            stage_summary = format_stage_stats(self.scan_stats)
+            log.info(f"Scan complete. Found {num_sets} sets ({num_duplicate_files} extra files), {len(result.similar_images)} similar image sets. Scanned: {len(result.files)}"); log.info(stage_summary)
+            log.info(result.metrics.summary())
+            if REPORT_PATH:
+                try: write_report(REPORT_PATH, result.report())
+                except OSError as e: log.error(f"Could not write the scan report: {e}")
+            if num_sets > 0 or similar_note: messagebox.showinfo("Scan Complete", f"Found {num_sets} sets ({num_duplicate_files} duplicate files).{similar_note}\n\n{stage_summary}")
+            else: messagebox.showinfo("Scan Complete", f"No duplicate files found.\n\n{stage_summary}")
+
+    # --- Results View Methods ---
+    def _tree_row(self, path, size):
+        """(text, values) for a result row; the size comes from the scan, not a new stat."""
+        links = len(self.hardlinks.get(path, ()))
+        text = f" {os.path.basename(path)}" + (f"  (+{links} hard link{'s' if links > 1 else ''})" if links else "")
+        return text, (os.path.dirname(path), format_size(size[path] if isinstance(size, dict) else size), path)
+
+    def _insert_groups(self, groups):
+        """Creates rows for `groups` (which must belong to the current page), restoring marked rows' selection.
+
+        The time it takes is booked to the scan's "ui_insert" phase.
+        """
+        started = time.perf_counter(); to_select = []
+        for digest, size, paths in groups:
+            parent_id = ""
+            for path in paths:
+                text, values = self._tree_row(path, size)
+                if not parent_id and isinstance(size, dict): text = " ≈" + text # similar images, not identical files
+                item_id = self.results_tree.insert(parent_id, tk.END, text=text, values=values, open=True)
+                if not parent_id: parent_id = item_id
+                self.visible_items[item_id] = path
+                if path in self.marked_paths: to_select.append(item_id)
+        if to_select: self.results_tree.selection_add(to_select)
+        self.scanner.metrics.add_time("ui_insert", time.perf_counter() - started)
+
+    def _render_page(self):
+        """Replaces the Treeview contents with the current page of result_groups."""
+        self.results_page = min(self.results_page, self._page_count() - 1)
+        self.results_tree.delete(*self.results_tree.get_children()); self.visible_items = {}
+        start = self.results_page * RESULTS_PAGE_SIZE
+        self._insert_groups(self.result_groups[start:start + RESULTS_PAGE_SIZE])
+        self._update_page_controls()
+
+    def _append_groups(self, groups):
+        """Adds streamed groups to the model; rows are only created for the ones landing on the current page."""
+        start = self.results_page * RESULTS_PAGE_SIZE; first_new = len(self.result_groups)
+        self.result_groups.extend(groups)
+        self._insert_groups(self.result_groups[max(first_new, start):start + RESULTS_PAGE_SIZE])
+        self._update_page_controls()
+
+    def _page_count(self):
+        return max(1, -(-len(self.result_groups) // RESULTS_PAGE_SIZE))
+
+    def _update_page_controls(self):
+        total = len(self.result_groups); start = self.results_page * RESULTS_PAGE_SIZE
+        self.page_label.configure(text=f"Sets {start + 1 if total else 0:,}–{min(total, start + RESULTS_PAGE_SIZE):,} of {total:,}")
+        self.prev_page_btn.configure(state="normal" if self.results_page > 0 else "disabled")
+        self.next_page_btn.configure(state="normal" if self.results_page < self._page_count() - 1 else "disabled")
+
+    def change_page(self, step):
+        self.results_page = min(max(0, self.results_page + step), self._page_count() - 1)
+        self._render_page(); self.results_tree.yview_moveto(0)
+
+    def _on_tree_select(self, event=None):
+        """Keeps marked_paths (the selection across every page) in step with what is selected on this page."""
+        self.marked_paths.difference_update(self.visible_items.values())
+        self.marked_paths.update(self.visible_items[item_id] for item_id in self.results_tree.selection() if item_id in self.visible_items)
+
+    def _clear_results(self):
+        self.result_groups = []; self.marked_paths.clear(); self.results_page = 0
+        self.duplicates_data = {}; self.hardlinks = {}; self.scanned_files = {}; self.scan_stats = {}
+        self._render_page()
+
+    def _remove_paths(self, removed):
+        """Drops cleaned-up (deleted, moved or linked) files from the results; groups left with a single file disappear."""
+        self.marked_paths.difference_update(removed)
+        groups = []
+        for digest, size, paths in self.result_groups:
+            paths = [path for path in paths if path not in removed]
+            if len(paths) > 1: groups.append((digest, size, paths))
+        self.result_groups = groups
+        self.duplicates_data = {digest: paths for digest, size, paths in groups if not isinstance(size, dict)}
+        self._render_page()
 
     # --- Button Action Methods ---
     def add_folder_clicked(self):
+        """Adds a folder to the scan; a folder inside one already listed is covered by it, one containing listed folders replaces them."""
+        if self.scan_running: return
         folder = filedialog.askdirectory();
         if folder:
-            self.folders_to_scan = [folder] # Replace list
-            print(f"Selected folder: {folder}")
-            self.folder_list_textbox.configure(state="normal"); self.folder_list_textbox.delete("1.0", tk.END)
-            self.folder_list_textbox.insert("1.0", folder); self.folder_list_textbox.configure(state="disabled")
-            print("Clearing previous results...")
-            for item in self.results_tree.get_children(): self.results_tree.delete(item) # Clear results
-            self.duplicates_data.clear()
+            folders = normalize_roots(self.folders_to_scan + [folder])
+            if folders == self.folders_to_scan: messagebox.showinfo("Already Included", f"{folder} is already part of the selected folders."); return
+            self.folders_to_scan = folders
+            log.info(f"Selected folders: {', '.join(folders)}")
+            self._show_folders()
+            log.info("Clearing previous results...")
+            self._clear_results()
+
+    def clear_folders_clicked(self):
+        if self.scan_running: return
+        self.folders_to_scan = []; self._show_folders(); self._clear_results()
+
+    def _show_folders(self):
+        self.folder_list_textbox.configure(state="normal"); self.folder_list_textbox.delete("1.0", tk.END)
+        self.folder_list_textbox.insert("1.0", "\n".join(self.folders_to_scan) or "No folder selected..."); self.folder_list_textbox.configure(state="disabled")
+
+    def choose_index_location_clicked(self):
+        """Lets the user pick where the hash index is stored (cancel turns caching off)."""
+        initial_dir, initial_file = os.path.split(self.index_path) if self.index_path else (os.path.expanduser("~"), "hash_index.sqlite3")
+        path = filedialog.asksaveasfilename(title="Hash Index Location", initialdir=initial_dir, initialfile=initial_file, defaultextension=".sqlite3", confirmoverwrite=False)
+        if path: self.index_path = path; log.info(f"Hash index location: {path}")
+        elif messagebox.askyesno("Hash Index", "Turn off the hash index? Every scan will re-read all candidate files."):
+            self.index_path = None; log.info("Hash index disabled.")
+
+    def prune_index_clicked(self):
+        """Removes index entries for files that no longer exist."""
+        if not self.index_path: messagebox.showinfo("Hash Index", "The hash index is turned off."); return
+        try:
+            index = HashIndex(self.index_path)
+            try: removed = index.prune_missing()
+            finally: index.close()
+            messagebox.showinfo("Hash Index", f"Removed {removed} stale entr{'y' if removed == 1 else 'ies'}.")
+        except Exception as e: log.error(f"Error pruning hash index: {e}"); messagebox.showerror("Hash Index", f"Could not prune the hash index:\n{e}")
+
+    def cancel_scan_clicked(self):
+        """Cancels the running scan, or the running clean-up (files already handled stay handled)."""
+        self.cancel_btn.configure(state="disabled")
+        if self.reclaimer: log.info("Cancelling clean-up..."); self.reclaimer.cancel_event.set()
+        else: log.info("Cancelling scan..."); self.scanner.hash_engine.cancel_event.set()
+
+    def _read_scan_filters(self):
+        """Reads the filter fields into walk_files() keyword arguments (raises ValueError on a bad size)."""
+        min_size = parse_size(self.min_size_entry.get()); max_size = parse_size(self.max_size_entry.get())
+        return {"include": parse_globs(self.include_entry.get()), "exclude": parse_globs(self.exclude_entry.get()),
+                "min_size": min_size or 0, "max_size": max_size}
 
     def scan_folders_clicked(self):
-        print("Scan Folders button clicked"); self.scan_btn.configure(state="disabled")
-        self.progress_bar.grid(row=3, column=0, padx=0, pady=(10, 0), sticky="ew"); self.progress_bar.start()
-        print("Progress bar started."); scan_thread=threading.Thread(target=self._run_scan_logic,daemon=True); scan_thread.start()
+        log.debug("Scan Folders button clicked")
+        if not self.folders_to_scan: log.info("No folder selected..."); messagebox.showerror("Error", "No folder selected..."); return
+        try: scan_filters = self._read_scan_filters()
+        except ValueError as e: messagebox.showerror("Invalid Filter", f"Sizes look like 500 KB, 2 MB or 1.5 GB.\n\n{e}"); return
+        if self.reclaim_running: messagebox.showinfo("Clean-up Running", "Please wait for the clean-up to finish (or cancel it) before scanning."); return
+        self.scan_btn.configure(state="disabled"); self.scan_running = True
+        hash_engine = HashingEngine(backend=self.digest_backend_menu.get()); log.info(f"Hashing with {hash_engine.workers} worker(s) ({'processes' if hash_engine.use_processes else 'threads'}), {hash_engine.backend}")
+        similar_images = NEAR_DUPLICATE_THRESHOLD if self.similar_images_check.get() else None
+        self.scanner = DuplicateScanner(hash_engine, self.index_path, scan_filters, progress=self._report_progress, similar_images=similar_images)
+        self._clear_results(); self.scan_queue = queue.Queue(); self.scan_progress = None; self.progress_phase = None
+        self._show_progress_controls("Cancel Scan")
+        scan_thread=threading.Thread(target=self._run_scan_logic,daemon=True); scan_thread.start()
+        self.root.after(UI_POLL_MS, self._poll_scan_queue)
+
+    def _on_reclaim_action_changed(self, label):
+        self.delete_btn.configure(text=next(text for menu_label, _, text in RECLAIM_ACTIONS if menu_label == label))
+
+    def _build_reclaim_plan(self, action):
+        """Plan entries for the selected files (every page), each with the unselected file it keeps.
+
+        Returns (plan, groups_fully_selected); one file of a fully selected group is always kept.
+        Files from similar-image groups get no digest: they are only checked by size.
+        """
+        plan = []; fully_selected = 0
+        for digest, size, paths in self.result_groups:
+            selected = [path for path in paths if path in self.marked_paths]
+            if not selected: continue
+            keep = next((path for path in paths if path not in self.marked_paths), None)
+            if keep is None: keep = selected.pop(0); fully_selected += 1
+            if isinstance(size, dict): plan.extend({"action": action, "path": path, "keep": keep, "size": size[path], "digest": None} for path in selected)
+            else: plan.extend({"action": action, "path": path, "keep": keep, "size": size, "digest": digest} for path in selected)
+        return plan, fully_selected
 
-    # --- CORRECTED delete_selected_clicked ---
     def delete_selected_clicked(self):
-        """Deletes files selected in the Treeview."""
-        selected_items = self.results_tree.selection()
-        if not selected_items:
+        """Cleans up the selected files (on every page) with the chosen action, in a background thread."""
+        if self.scan_running: messagebox.showinfo("Scan Running", "Please wait for the scan to finish (or cancel it) before deleting."); return
+        if self.reclaim_running: return
+        label, action, _ = next(entry for entry in RECLAIM_ACTIONS if entry[0] == self.reclaim_action_menu.get())
+        plan, fully_selected = self._build_reclaim_plan(action)
+        if not plan and not fully_selected:
             messagebox.showinfo("No Selection", "Please select files to delete from the list.")
             return
-
-        paths_to_delete = []
-        print(f"Attempting to get paths for {len(selected_items)} selected items...")
-        for item_id in selected_items:
-            # CORRECTED try...except block for getting item data
-            try:  # <--- Start try for this item_id
-                item_data = self.results_tree.item(item_id)
-                print(f"Processing item {item_id}: Data = {item_data}") # Debugging print
-
-                if item_data and 'values' in item_data and isinstance(item_data['values'], (list, tuple)):
-                    if len(item_data['values']) > 2:
-                        full_path = item_data['values'][2] # Index 2 holds the full path
-                        print(f"  Extracted full_path: {full_path}") # Debugging print
-
-                        if isinstance(full_path, str) and full_path and os.path.exists(full_path):
-                            paths_to_delete.append((item_id, full_path))
-                            print(f"  Added valid path to delete list: {full_path}") # Debugging print
-                        else:
-                            print(f"  Warning: Invalid or non-existent path for item {item_id}. Path: '{full_path}'")
-                    else:
-                        print(f"  Warning: 'values' tuple too short for item {item_id}. Values: {item_data['values']}")
-                else:
-                    print(f"  Warning: Invalid or missing 'values' for item {item_id}. Item data: {item_data}")
-
-            except Exception as e: # <--- CORRECTLY INDENTED except block for getting item data
-                print(f"  Error processing item {item_id}: {e}")
-        # End of loop for getting paths
-
-        if not paths_to_delete:
-             messagebox.showwarning("No Valid Paths", "Could not retrieve valid file paths for any selected items. Nothing will be deleted.")
-             return
-
-        print(f"Collected {len(paths_to_delete)} valid paths to potentially delete.")
-        confirm_msg = f"Are you sure you want to permanently delete {len(paths_to_delete)} selected file(s)?"
-        confirm = messagebox.askyesno("Confirm Delete", confirm_msg)
+        keep_note = f"\n\nEvery file of {fully_selected} set(s) is selected; the first file of each is kept." if fully_selected else ""
+        if not plan: messagebox.showinfo("Nothing To Do", keep_note.strip()); return
+
+        log.info(f"Collected {len(plan)} paths to clean up ({action}).")
+        confirm_msg = {
+            "delete": f"Are you sure you want to permanently delete {len(plan)} selected file(s)?",
+            "trash": f"Move {len(plan)} selected file(s) to the trash?",
+            "quarantine": f"Move {len(plan)} selected file(s) to the quarantine folder?",
+            "hardlink": f"Replace {len(plan)} selected file(s) with hard links to the copy that is kept?",
+            "reflink": f"Replace {len(plan)} selected file(s) with copy-on-write clones of the copy that is kept?",
+        }[action]
+        similar_count = sum(entry["digest"] is None for entry in plan)
+        if similar_count: keep_note += (f"\n\n{similar_count} of them are similar images, not identical copies: they can't be replaced with links"
+                                        + (", and Undo can't bring them back once deleted." if action == "delete" else "."))
+        linked_count = sum(bool(self.hardlinks.get(entry["path"])) for entry in plan)
+        if linked_count: keep_note += f"\n\n{linked_count} of them have other hard-link names: their space is only freed once those are removed too."
+        confirm = messagebox.askyesno(f"Confirm {label}", confirm_msg + "\n\nEach file is re-checked against its set first." + keep_note)
         if not confirm:
-            print("Deletion cancelled by user.")
+            log.info("Deletion cancelled by user.")
             return
 
-        deleted_count = 0
-        errors = []
-        for item_id, path in paths_to_delete:
-            try: # Separate try block for the actual deletion
-                os.remove(path)
-                print(f"Deleted: {path}")
-                # Safely delete from Treeview only if os.remove succeeded
-                if self.results_tree.exists(item_id): # Check if item still exists before deleting
-                     self.results_tree.delete(item_id)
-                deleted_count += 1
-            except Exception as e:
-                print(f"Error deleting {path}: {e}")
-                errors.append(f"{os.path.basename(path)}: {e}")
-
-        result_message = f"{deleted_count} file(s) deleted."
+        backend = self.scanner.hash_engine.backend # the listed digests come from the last scan started, finished or not
+        self.reclaimer = Reclaimer(action, backend); self.reclaim_state = (action, 0, len(plan), 0, [])
+        self._start_reclaim_ui()
+        threading.Thread(target=self._run_reclaim, args=(plan,), daemon=True).start()
+        self.root.after(UI_POLL_MS, self._poll_reclaim_queue)
+
+    def _run_reclaim(self, plan):
+        """Runs in the clean-up thread; every batch of handled files goes to the UI through reclaim_queue."""
+        try:
+            with self.reclaimer as reclaimer: freed = reclaimer.run(plan, progress=lambda *state: self.reclaim_queue.put(("batch", state)))
+            self.reclaim_queue.put(("done", freed))
+        except Exception as e: log.error(f"Error during clean-up: {e}"); self.reclaim_queue.put(("error", e))
+
+    def _poll_reclaim_queue(self):
+        """UI tick while cleaning up: drops the handled files from the results, one tree update per tick."""
+        handled = set(); finished = None
+        while True:
+            try: kind, payload = self.reclaim_queue.get_nowait()
+            except queue.Empty: break
+            if kind != "batch": finished = (kind, payload); break
+            done, total, freed, batch = payload
+            action, _, _, _, errors = self.reclaim_state
+            errors.extend(f"{os.path.basename(entry['path'])}: {error}" for entry, error in batch if error)
+            handled.update(entry["path"] for entry, error in batch if not error)
+            self.reclaim_state = (action, done, total, freed, errors)
+        if handled: self._remove_paths(handled)
+        action, done, total, freed, errors = self.reclaim_state
+        if total:
+            self.progress_bar.set(done / total)
+            self.progress_label.configure(text=f"{self.delete_btn.cget('text').replace(' Selected', '')}: {done:,} / {total:,} files · {format_size(freed)} reclaimed")
+        if finished: self._finish_reclaim(*finished)
+        else: self.root.after(UI_POLL_MS, self._poll_reclaim_queue)
+
+    def _start_reclaim_ui(self):
+        self.reclaim_running = True; self.reclaim_queue = queue.Queue()
+        self.delete_btn.configure(state="disabled"); self.undo_btn.configure(state="disabled"); self.scan_btn.configure(state="disabled")
+        self._show_progress_controls("Cancel")
+
+    def _finish_reclaim(self, kind, payload):
+        journal_path = self.reclaimer.journal_path if self.reclaimer and self.reclaimer.changed else None
+        self.reclaimer = None; self.reclaim_running = False
+        self._hide_progress_controls()
+        self.delete_btn.configure(state="normal"); self.undo_btn.configure(state="normal"); self.scan_btn.configure(state="normal")
+        if kind == "error": messagebox.showerror("Clean-up Error", f"Error during clean-up:\n{payload}"); return
+        if kind == "undone":
+            restored, errors = payload
+            result_message = f"{restored} file(s) restored. Scan again to list them."
+            if errors: messagebox.showerror("Undo Errors", result_message + "\n\nErrors occurred for:\n" + "\n".join(errors[:20]))
+            else: messagebox.showinfo("Undone", result_message)
+            return
+        action, done, total, freed, errors = self.reclaim_state
+        result_message = f"{done - len(errors)} of {total} file(s) handled, {format_size(payload)} reclaimed.\n" + (f"Undo journal: {journal_path}" if journal_path else "Nothing was changed.")
+        if done < total: result_message += f"\n\nCancelled; {total - done} file(s) were not touched."
         if errors:
-            result_message += f"\n\nErrors occurred for:\n" + "\n".join(errors)
-            messagebox.showerror("Deletion Errors", result_message)
+            result_message += f"\n\nErrors occurred for:\n" + "\n".join(errors[:20]) + (f"\n... and {len(errors) - 20} more" if len(errors) > 20 else "")
+            messagebox.showerror("Clean-up Errors", result_message)
         else:
-            messagebox.showinfo("Deleted", result_message)
-        print("Deletion process finished.")
+            messagebox.showinfo("Clean-up Finished", result_message)
+        log.info("Clean-up finished.")
+
+    def undo_last_clicked(self):
+        """Reverses the most recent clean-up from its journal (in a background thread)."""
+        if self.scan_running or self.reclaim_running: messagebox.showinfo("Busy", "Please wait for the running scan or clean-up to finish."); return
+        journal_path = latest_journal()
+        if not journal_path: messagebox.showinfo("Undo", "There is no clean-up to undo."); return
+        if not messagebox.askyesno("Undo Last Clean-up", f"Restore the files changed by this clean-up?\n\n{journal_path}"): return
+        self.reclaim_state = ("undo", 0, 0, 0, [])
+        self._start_reclaim_ui(); self.cancel_btn.grid_forget(); self.progress_label.configure(text="Undoing last clean-up...")
+        def run_undo():
+            try: self.reclaim_queue.put(("undone", undo_journal(journal_path)))
+            except Exception as e: log.error(f"Error during undo: {e}"); self.reclaim_queue.put(("error", e))
+        threading.Thread(target=run_undo, daemon=True).start()
+        self.root.after(UI_POLL_MS, self._poll_reclaim_queue)
 
 
     def select_all_but_first(self):
-        """Selects all child items (duplicates) in the Treeview."""
-        print("Selecting duplicates (keeping first in each group)..."); self.results_tree.selection_set();
-        top_level_items=self.results_tree.get_children(""); items_to_select=[];
-        for parent_id in top_level_items:
-            child_items=self.results_tree.get_children(parent_id);
-            if child_items: items_to_select.extend(child_items)
-        if items_to_select: self.results_tree.selection_add(items_to_select); print(f"Selected {len(items_to_select)} duplicate items.")
-        else: print("No duplicate items found to select.")
+        """Selects every duplicate in every group (keeping the first file of each), on all pages. Similar images are left for the user to pick."""
+        log.info("Selecting duplicates (keeping first in each group)...")
+        self.marked_paths = {path for _, size, paths in self.result_groups if not isinstance(size, dict) for path in paths[1:]}
+        self.results_tree.selection_set([item_id for item_id, path in self.visible_items.items() if path in self.marked_paths])
+        if self.marked_paths: log.info(f"Selected {len(self.marked_paths)} duplicate items.")
+        else: log.info("No duplicate items found to select.")
 
     def run(self):
          """Apply initial theme and start the main loop."""
@@ -317,6 +574,7 @@ class DuplicateDetectorApp:
 
 # --- Main Execution Block ---
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     # Ensure PIL is installed: pip install Pillow
     # Ensure you have an icon file named "add_folder_icon.png" or change path
     root = ctk.CTk()
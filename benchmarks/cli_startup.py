@@ -0,0 +1,59 @@
+"""Cold-start time of the command line (`python -m duplicate_detective --version`).
+
+Usage: python benchmarks/cli_startup.py [--runs 20] [--record FILE] [--budget-ms 250]
+
+Each run is a fresh interpreter. Also fails if the CLI pulls in the GUI stack
+(tkinter, customtkinter, PIL). --record appends the result as a JSON line so the
+numbers can be tracked over time; --budget-ms exits 1 when the median is slower.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("tkinter", "customtkinter", "PIL")
+
+def time_run(command):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=REPO, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+def gui_modules_imported():
+    """Top-level modules from GUI_MODULES that `-X importtime` shows the CLI importing."""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-m", "duplicate_detective", "--version"], cwd=REPO, capture_output=True, text=True).stderr
+    imported = {line.rsplit("|", 1)[-1].strip().split(".")[0] for line in output.splitlines() if line.startswith("import time:")}
+    return sorted(imported.intersection(GUI_MODULES))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--record", metavar="FILE", help="append the result to this JSON Lines file")
+    parser.add_argument("--budget-ms", type=float, help="exit 1 if the median is above this")
+    args = parser.parse_args()
+
+    baseline = [time_run([sys.executable, "-c", "pass"]) for _ in range(args.runs)]
+    cli = [time_run([sys.executable, "-m", "duplicate_detective", "--version"]) for _ in range(args.runs)]
+    result = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+        "runs": args.runs, "interpreter_ms": round(statistics.median(baseline), 1),
+        "cli_median_ms": round(statistics.median(cli), 1), "cli_min_ms": round(min(cli), 1),
+        "gui_modules_imported": gui_modules_imported(),
+    }
+    print(f"bare interpreter: {result['interpreter_ms']} ms (median)")
+    print(f"CLI cold start:   {result['cli_median_ms']} ms (median), {result['cli_min_ms']} ms (best)")
+    print(f"GUI modules imported: {', '.join(result['gui_modules_imported']) or 'none'}")
+    if args.record:
+        with open(args.record, "a", encoding="utf-8") as f: f.write(json.dumps(result) + "\n")
+
+    if result["gui_modules_imported"]: return 1
+    if args.budget_ms is not None and result["cli_median_ms"] > args.budget_ms:
+        print(f"Over budget ({args.budget_ms} ms)"); return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
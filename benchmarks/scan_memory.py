@@ -0,0 +1,53 @@
+"""Peak memory (RSS) of a scan, reported per million files.
+
+Usage: python benchmarks/scan_memory.py [--files 200000] [--duplicates 0.1] [--tree DIR] [--record FILE]
+
+Builds a synthetic tree (sparse files of 1 byte to 1 MiB, a share of them
+duplicates; see synthetic_tree.py) unless --tree points at an existing one,
+then scans it in a fresh interpreter twice: without the hash index and with a warm index. The interpreter's
+own footprint (measured after imports) is subtracted. Unix only (uses resource).
+
+The scans run through scan_throughput.py's harness with one worker; this only keeps the memory
+columns of its result (scan_throughput.py reports them too, next to the timings).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+from scan_throughput import measure, scan_once
+from synthetic_tree import build_tree
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200000, help="size of the synthetic tree")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of files that are copies")
+    parser.add_argument("--tree", help="scan this folder instead of building one")
+    parser.add_argument("--record", metavar="FILE", help="append the result to this JSON Lines file")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        tree = args.tree
+        if not tree:
+            tree = os.path.join(work, "tree"); start = time.perf_counter()
+            build_tree(tree, args.files, duplicates=args.duplicates)
+            print(f"built {args.files:,} files in {time.perf_counter() - start:.0f} s")
+        index_path = os.path.join(work, "index.sqlite3")
+        cold = measure(tree, "")
+        scan_once(tree, index_path) # fill the index
+        warm = measure(tree, index_path)
+        result = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+                  "files": cold["files"], "groups": cold["duplicate_sets"], "no_index": cold, "warm_index": warm}
+        print(f"{cold['files']:,} files, {cold['duplicate_sets']:,} duplicate sets")
+        for label, run in (("no index", cold), ("warm index", warm)):
+            print(f"{label:<11} peak {run['peak_mb']:8.1f} MB above interpreter  = {run['per_million_files_mb']:8.1f} MB per million files")
+        if args.record:
+            with open(args.record, "a", encoding="utf-8") as f: f.write(json.dumps(result) + "\n")
+    finally: shutil.rmtree(work, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Scan throughput and peak memory, phase by phase, with a regression check.
+
+Usage: python benchmarks/scan_throughput.py [--files 100000] [--sizes loguniform:1:1MB] [--duplicates 0.1]
+       [--hardlinks 0.02] [--dense] [--tree DIR] [--workers N] [--runs 3] [--record FILE] [--baseline FILE]
+
+Builds a synthetic tree (see synthetic_tree.py) unless --tree points at an existing one, then
+scans it in a fresh interpreter without the hash index and with a warm index, keeping the
+fastest of --runs runs of each. Prints files/s, hashed MB/s, peak memory (RSS above the
+interpreter's own) and the time spent in each phase of the scan (from its metrics report).
+The files are in the page cache after the first run, so this measures the scanner, not the disk.
+
+--record appends the result as a JSON line; --baseline compares with the last line of a
+recorded file that used the same tree settings and exits 1 if throughput dropped or memory
+grew by more than --tolerance. Unix only (uses resource); with --processes the workers'
+memory isn't included.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_tree import REPO, build_tree
+
+CHILD = r"""
+import json, logging, resource, sys
+sys.path.insert(0, sys.argv[1])
+logging.disable(logging.CRITICAL)
+from duplicate_detective.engine import DuplicateScanner, HashingEngine
+def peak_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # bytes on macOS, KiB elsewhere
+base = peak_kb()
+engine = HashingEngine(workers=int(sys.argv[4]), use_processes=sys.argv[5] == "1")
+try: result = DuplicateScanner(engine, sys.argv[3] or None).scan(sys.argv[2])
+finally: engine.shutdown()
+print(json.dumps({**result.report(), "base_kb": base, "peak_kb": peak_kb()}))
+"""
+PHASE_COLUMNS = ("walk", "stat", "partial_hash", "full_hash", "grouping", "index")
+
+def scan_once(tree, index_path="", workers=1, processes=False):
+    """Scans `tree` in a fresh interpreter (with the index at `index_path`, if any); its metrics report plus peak memory."""
+    output = subprocess.run([sys.executable, "-c", CHILD, REPO, tree, index_path, str(workers), "1" if processes else "0"],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def measure(tree, index_path="", workers=1, processes=False, runs=1):
+    """Fastest of `runs` scans, as a flat record."""
+    best = None
+    for _ in range(runs):
+        report = scan_once(tree, index_path, workers, processes)
+        if best is None or report["wall_seconds"] < best["wall_seconds"]: best = report
+    files = best["counters"].get("files_walked", 0); wall = best["wall_seconds"]
+    hashed = best["counters"].get("partial_bytes_read", 0) + best["counters"].get("full_bytes_read", 0)
+    peak_mb = (best["peak_kb"] - best["base_kb"]) / 1024
+    return {"files": files, "duplicate_sets": best["duplicate_sets"], "wall_seconds": wall,
+            "files_per_second": round(files / wall), "hashed_mb_per_second": round(hashed / 2**20 / wall, 1),
+            "peak_mb": round(peak_mb, 1), "per_million_files_mb": round(peak_mb * 1_000_000 / max(1, files), 1),
+            "phases": best["phases"], "counters": best["counters"], "syscalls": best["syscalls"]}
+
+def compare(result, baseline_path, tolerance):
+    """Lines describing each change against the last matching baseline, and whether any is a regression."""
+    try:
+        with open(baseline_path, encoding="utf-8") as f: records = [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError: records = []
+    matching = [record for record in records if record.get("config") == result["config"]]
+    if not matching: return [f"no baseline with these settings in {baseline_path}"], False
+    baseline = matching[-1]; lines = []; regressed = False
+    for mode in ("no_index", "warm_index"):
+        for key, higher_is_better in (("files_per_second", True), ("per_million_files_mb", False)):
+            old, new = baseline[mode][key], result[mode][key]
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = "REGRESSION" if worse > tolerance else "ok"
+            regressed |= worse > tolerance
+            lines.append(f"{mode:<11} {key:<21} {old:>12,} -> {new:>12,} ({change:+.1%}) {flag}")
+    return [f"baseline from {baseline['time']}"] + lines, regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=100000, help="size of the synthetic tree")
+    parser.add_argument("--sizes", default="loguniform:1:1MB", help="size distribution (see synthetic_tree.py)")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of files that are copies")
+    parser.add_argument("--hardlinks", type=float, default=0.02, help="share of files that are hard links")
+    parser.add_argument("--dense", action="store_true", help="files hold real data instead of holes")
+    parser.add_argument("--tree", help="scan this folder instead of building one")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing workers (default: one per CPU)")
+    parser.add_argument("--processes", action="store_true", help="hash in worker processes")
+    parser.add_argument("--runs", type=int, default=3, help="scans per mode; the fastest counts")
+    parser.add_argument("--record", metavar="FILE", help="append the result to this JSON Lines file")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with the last matching result in this JSON Lines file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown / memory growth before --baseline fails")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    try:
+        tree = args.tree
+        if not tree:
+            tree = os.path.join(work, "tree"); start = time.perf_counter()
+            built = build_tree(tree, args.files, args.sizes, args.duplicates, args.hardlinks, dense=args.dense)
+            print(f"built {built['files']:,} files ({built['duplicates']:,} copies, {built['hardlinks']:,} hard links) in {time.perf_counter() - start:.0f} s")
+        config = {"tree": args.tree, "workers": args.workers, "processes": args.processes} | ({} if args.tree else
+                  {"files": args.files, "sizes": args.sizes, "duplicates": args.duplicates, "hardlinks": args.hardlinks, "dense": args.dense})
+        index_path = os.path.join(work, "index.sqlite3")
+        cold = measure(tree, "", args.workers, args.processes, args.runs)
+        scan_once(tree, index_path, args.workers) # fill the index
+        warm = measure(tree, index_path, args.workers, args.processes, args.runs)
+        result = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+                  "config": config, "no_index": cold, "warm_index": warm}
+
+        print(f"{cold['files']:,} files, {cold['duplicate_sets']:,} duplicate sets, {args.workers} worker(s)")
+        print(f"{'':<11} {'files/s':>9} {'MB/s':>7} {'wall s':>7} {'peak MB':>8} " + " ".join(f"{name:>12}" for name in PHASE_COLUMNS))
+        for label, run in (("no index", cold), ("warm index", warm)):
+            print(f"{label:<11} {run['files_per_second']:>9,} {run['hashed_mb_per_second']:>7} {run['wall_seconds']:>7.2f} {run['peak_mb']:>8} "
+                  + " ".join(f"{run['phases'].get(name, 0):>12.3f}" for name in PHASE_COLUMNS))
+        print("system calls (no index): " + ", ".join(f"{name} {count:,}" for name, count in sorted(cold["syscalls"].items())))
+
+        regressed = False
+        if args.baseline:
+            lines, regressed = compare(result, args.baseline, args.tolerance)
+            print("\n".join(lines))
+        if args.record:
+            with open(args.record, "a", encoding="utf-8") as f: f.write(json.dumps(result) + "\n")
+    finally: shutil.rmtree(work, ignore_errors=True)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Synthetic folder trees for the scan benchmarks.
+
+Usage: python benchmarks/synthetic_tree.py DIR [--files 100000] [--sizes loguniform:1:1MB]
+       [--duplicates 0.1] [--hardlinks 0.02] [--per-folder 100] [--dense] [--seed 1]
+
+The same arguments and seed always give the same tree. Sizes follow a distribution:
+"loguniform:MIN:MAX" (many small files, a few big ones, like a real disk), "uniform:MIN:MAX"
+or "fixed:SIZE" (every file the same size: the worst case for the size check). --duplicates is
+the share of files that copy an earlier file's content, --hardlinks the share that are extra
+names for an earlier file. Files are sparse by default (a random 64-byte head, then a hole), so
+a million of them take seconds to build and little disk; same-size files still differ in the
+partial hash, like real data. --dense writes random bytes all the way through instead.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from duplicate_detective.engine import format_size, parse_size
+
+DISTRIBUTIONS = ("loguniform", "uniform", "fixed")
+ORIGINALS_KEPT = 1000 # Files duplicates are copied from (the first ones written)
+
+def size_sampler(spec, rng):
+    """'loguniform:1:1MB' -> a function returning random sizes in bytes; raises ValueError for bad specs."""
+    name, *bounds = spec.split(":")
+    if name not in DISTRIBUTIONS: raise ValueError(f"Unknown size distribution '{name}' (available: {', '.join(DISTRIBUTIONS)})")
+    bounds = [parse_size(bound) for bound in bounds]
+    if name == "fixed":
+        if len(bounds) != 1: raise ValueError("fixed takes one size, e.g. fixed:4KB")
+        return lambda: bounds[0]
+    if len(bounds) != 2 or bounds[0] > bounds[1]: raise ValueError(f"{name} takes MIN:MAX, e.g. {name}:1:1MB")
+    low, high = bounds
+    if name == "uniform": return lambda: rng.randint(low, high)
+    return lambda: int(math.exp(rng.uniform(math.log(max(1, low)), math.log(high + 1)))) if high else 0
+
+def content(seed, size, dense):
+    """Bytes to write for a file with this content seed: all of it (dense) or just its 64-byte head (sparse)."""
+    return random.Random(seed).randbytes(size if dense else min(size, 64))
+
+def build_tree(root, count, sizes="loguniform:1:1MB", duplicates=0.1, hardlinks=0.0, per_folder=100, dense=False, seed=1):
+    """Writes `count` files below `root`, `per_folder` per folder and 100 folders per parent; returns what it built.
+
+    About `duplicates` of the files copy an earlier file's content and `hardlinks` of them are
+    extra names (os.link) for an earlier file. The summary has the file, byte, duplicate and
+    hard link counts, for checking a scan's results.
+    """
+    rng = random.Random(seed); next_size = size_sampler(sizes, rng)
+    originals = []; written = [] # (content seed, size); paths to link to
+    summary = {"files": 0, "bytes": 0, "duplicates": 0, "hardlinks": 0, "folders": 0}
+    for i in range(count):
+        folder = os.path.join(root, f"d{i // (per_folder * 100):03d}", f"s{i // per_folder:05d}")
+        if i % per_folder == 0: os.makedirs(folder, exist_ok=True); summary["folders"] += 1
+        path = os.path.join(folder, f"file_{i:07d}.bin")
+        draw = rng.random()
+        if written and draw < hardlinks:
+            source = rng.choice(written); os.link(source, path)
+            summary["hardlinks"] += 1; summary["files"] += 1; summary["bytes"] += os.stat(source).st_size
+            continue
+        if originals and draw < hardlinks + duplicates: content_seed, size = rng.choice(originals); summary["duplicates"] += 1
+        else:
+            content_seed, size = rng.getrandbits(64), next_size()
+            if len(originals) < ORIGINALS_KEPT: originals.append((content_seed, size))
+        with open(path, "wb") as f: f.write(content(content_seed, size, dense)); f.truncate(size)
+        if len(written) < ORIGINALS_KEPT: written.append(path)
+        summary["files"] += 1; summary["bytes"] += size
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", metavar="DIR", help="folder to create the tree in (must not exist yet)")
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--sizes", default="loguniform:1:1MB", help="size distribution (default: %(default)s)")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="share of files that are copies (default: %(default)s)")
+    parser.add_argument("--hardlinks", type=float, default=0.0, help="share of files that are hard links (default: %(default)s)")
+    parser.add_argument("--per-folder", type=int, default=100, help="files per folder (default: %(default)s)")
+    parser.add_argument("--dense", action="store_true", help="write real data instead of sparse files")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if os.path.exists(args.root): parser.error(f"{args.root} already exists")
+    try: size_sampler(args.sizes, random.Random())
+    except ValueError as e: parser.error(str(e))
+
+    start = time.perf_counter()
+    summary = build_tree(args.root, args.files, args.sizes, args.duplicates, args.hardlinks, args.per_folder, args.dense, args.seed)
+    print(f"built {summary['files']:,} files ({format_size(summary['bytes'])}, {summary['duplicates']:,} copies, {summary['hardlinks']:,} hard links) "
+          f"in {summary['folders']:,} folders in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
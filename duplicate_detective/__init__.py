@@ -0,0 +1,14 @@
+"""Duplicate Detective: find files with identical content.
+
+The scan engine has no GUI dependencies; the window lives in "Duplicate Detective Code.py"
+and the command line in `python -m duplicate_detective`.
+"""
+__version__ = "1.1.0"
+
+from .engine import (
+    DIGEST_BACKENDS, DuplicateScanner, FileRecord, FileTable, HashIndex, HashingEngine, KEEP_POLICIES, ScanCancelled, ScanCheckpoint, ScanResult,
+    file_digest, file_sample_digest, format_size, format_stage_stats, hash_file, hash_file_sample, list_directory, normalize_roots, plan_deletion, plan_group, reclaimable_bytes, walk_files,
+)
+from .metrics import ScanMetrics, profiled, write_report
+from .perceptual import HammingIndex, group_similar, hash_thumbnails, image_thumbnail
+from .reclaim import Reclaimer, VerificationError, undo_journal
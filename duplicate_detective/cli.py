@@ -0,0 +1,192 @@
+"""Command line for headless scans: python -m duplicate_detective ROOT [ROOT ...]
+
+Duplicate groups are written to stdout (JSON Lines or CSV) as soon as each one is confirmed;
+progress and the per-stage summary go to stderr. Each root is scanned on its own, unless
+--together scans them as one set (duplicates across roots; nested roots are walked once).
+An interrupted scan resumes where it stopped the next time the same roots are scanned with
+the same filters (checkpoints live in the hash index; --restart ignores them).
+
+--similar-images also lists groups of images that look alike (resized, re-encoded, lightly
+edited); they are only reported, never part of a delete plan. Needs Pillow.
+
+--delete applies the plan with --action (delete, quarantine, hardlink, reflink, or trash
+when Send2Trash is installed); every file is re-verified first and each change is journaled
+so `--undo` can reverse the run.
+
+--report writes each scan's phase timings and file/byte/system call counters as JSON;
+--profile runs the whole command under cProfile; --verbose lists unreadable files.
+
+Exit codes: 0 no duplicates, 1 duplicates found, 2 usage, scan or output error,
+3 some files could not be deleted/replaced (or restored by --undo), 130 interrupted.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+
+from . import __version__
+from .engine import (
+    DEFAULT_INDEX_PATH, DEVICE_IO_LIMITS, DIGEST_BACKEND, DIGEST_BACKENDS, HASH_WORKERS, KEEP_POLICIES, USE_PROCESS_POOL,
+    DuplicateScanner, HashingEngine, format_size, format_stage_stats, parse_device_limit, parse_size, plan_deletion, plan_group, reclaimable_bytes,
+)
+from .metrics import profiled, write_report
+from .perceptual import NEAR_DUPLICATE_HASH, NEAR_DUPLICATE_THRESHOLD, PERCEPTUAL_HASHES
+from .reclaim import ACTIONS, DEFAULT_JOURNAL_DIR, DEFAULT_QUARANTINE_DIR, Reclaimer, VerificationError, latest_journal, undo_journal
+
+EXIT_NO_DUPLICATES = 0
+EXIT_DUPLICATES_FOUND = 1
+EXIT_ERROR = 2
+EXIT_DELETE_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+log = logging.getLogger("duplicate_detective")
+
+GROUP_FIELDS = ["root", "group", "digest", "size", "path"]
+PLAN_FIELDS = ["root", "action", "path", "keep", "size", "digest", "status"]
+DONE_STATUS = {"delete": "deleted", "quarantine": "quarantined", "hardlink": "linked", "reflink": "linked", "trash": "trashed"}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="duplicate_detective", description="Find files with identical content.")
+    parser.add_argument("roots", nargs="*", metavar="ROOT", help="folder to scan (several roots are scanned one after another)")
+    parser.add_argument("--together", action="store_true", help="scan all ROOTs as one set, so duplicates across them are found")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    output = parser.add_argument_group("output")
+    output.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="output format (default: jsonl)")
+    output.add_argument("-o", "--output", help="write to this file instead of stdout")
+    output.add_argument("-q", "--quiet", action="store_true", help="no progress or summary on stderr")
+    output.add_argument("-v", "--verbose", action="store_true", help="also list every file that could not be read, and the phase timings")
+    diagnostics = parser.add_argument_group("diagnostics")
+    diagnostics.add_argument("--report", metavar="FILE", help="write phase timings and file/byte/system call counts of each scan as JSON")
+    diagnostics.add_argument("--profile", metavar="FILE", help="run under cProfile and save the stats to FILE (the scan thread only, not hashing workers)")
+    diagnostics.add_argument("--trace", action="store_true", help="log each scan phase as it starts and ends")
+    filters = parser.add_argument_group("filters")
+    filters.add_argument("--include", action="append", default=[], metavar="GLOB", help="only scan matching files (repeatable)")
+    filters.add_argument("--exclude", action="append", default=[], metavar="GLOB", help="skip matching files and folders (repeatable)")
+    filters.add_argument("--min-size", type=parse_size, default=None, metavar="SIZE", help="skip smaller files, e.g. 1KB")
+    filters.add_argument("--max-size", type=parse_size, default=None, metavar="SIZE", help="skip larger files, e.g. 2GB")
+    hashing = parser.add_argument_group("hashing")
+    hashing.add_argument("--workers", type=int, default=HASH_WORKERS, help=f"files hashed at once (default: {HASH_WORKERS})")
+    hashing.add_argument("--device-limit", action="append", type=parse_device_limit, default=[], metavar="PATH=N",
+                         help="read at most N files at once from the drive holding PATH, e.g. D:\\=1 for a spinning disk (repeatable)")
+    hashing.add_argument("--processes", action="store_true", default=USE_PROCESS_POOL, help="hash in worker processes instead of threads")
+    hashing.add_argument("--digest", choices=list(DIGEST_BACKENDS), default=DIGEST_BACKEND, help=f"hash algorithm (default: {DIGEST_BACKEND})")
+    hashing.add_argument("--index", default=DEFAULT_INDEX_PATH, metavar="PATH", help="hash index file (default: %(default)s)")
+    hashing.add_argument("--no-index", action="store_true", help="don't read or update the hash index (also turns off resuming)")
+    hashing.add_argument("--restart", action="store_true", help="don't resume an interrupted scan of the same roots, start over")
+    similar = parser.add_argument_group("similar images")
+    similar.add_argument("--similar-images", nargs="?", type=int, const=NEAR_DUPLICATE_THRESHOLD, metavar="BITS",
+                         help=f"also group images that look alike, at most BITS of 64 apart (default: {NEAR_DUPLICATE_THRESHOLD}); needs Pillow")
+    similar.add_argument("--similar-hash", choices=PERCEPTUAL_HASHES, default=NEAR_DUPLICATE_HASH, help=f"perceptual hash to compare (default: {NEAR_DUPLICATE_HASH})")
+    deleting = parser.add_argument_group("deleting")
+    deleting.add_argument("--keep", choices=KEEP_POLICIES, default="first", help="which file of each group to keep (default: first found)")
+    deleting.add_argument("--dry-run", action="store_true", help="print the delete plan instead of the groups; nothing is deleted")
+    deleting.add_argument("--delete", action="store_true", help="apply --action to every file the plan lists")
+    deleting.add_argument("--action", choices=ACTIONS, default="delete", help="what --delete does with each duplicate (default: delete, permanent!)")
+    deleting.add_argument("--quarantine-dir", default=DEFAULT_QUARANTINE_DIR, metavar="PATH", help="where --action quarantine moves files (default: %(default)s)")
+    deleting.add_argument("--journal-dir", default=DEFAULT_JOURNAL_DIR, metavar="PATH", help="undo journals (default: %(default)s)")
+    deleting.add_argument("--undo", nargs="?", const="latest", metavar="JOURNAL", help="reverse a --delete run (default: the latest one) and exit")
+    return parser
+
+class OutputError(Exception):
+    """Writing the results failed (raised from scan callbacks, so it mustn't pass for a scan error)."""
+
+class _Writer:
+    """Writes records as JSON Lines or CSV, flushing after each so output streams."""
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream; self.fields = fields
+        self.csv = csv.DictWriter(stream, fieldnames=fields, extrasaction="ignore") if fmt == "csv" else None
+        self.write(None)
+
+    def write(self, record):
+        """Writes `record` (None: just the CSV header); raises OutputError if the stream can't take it."""
+        try:
+            if self.csv: self.csv.writeheader() if record is None else self.csv.writerow(record)
+            elif record is not None: self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError) as e: raise OutputError(f"{getattr(self.stream, 'name', 'output')}: can't write results: {e}") from e
+
+def undo(args, say):
+    journal = latest_journal(args.journal_dir) if args.undo == "latest" else args.undo
+    if not journal: say(f"No journal to undo in {args.journal_dir}"); return EXIT_ERROR
+    try: restored, errors = undo_journal(journal)
+    except OSError as e: say(f"{journal}: {e}"); return EXIT_ERROR
+    say(f"{journal}: restored {restored} file(s), {len(errors)} failed")
+    return EXIT_DELETE_FAILED if errors else EXIT_NO_DUPLICATES
+
+def trace(event, phase, seconds):
+    log.info(f"[{event}] {phase}" + (f" ({seconds:.3f} s)" if event == "end" else ""))
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(format="%(message)s", stream=sys.stderr)
+    log.setLevel(logging.ERROR if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+    with profiled(args.profile): return run(args)
+
+def run(args):
+    say = (lambda message: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+    if args.undo: return undo(args, say)
+    if not args.roots: build_parser().error("at least one ROOT is required (or --undo)")
+    planning = args.dry_run or args.delete
+    filters = {"include": args.include, "exclude": args.exclude, "min_size": args.min_size or 0, "max_size": args.max_size}
+    hash_engine = HashingEngine(workers=args.workers, use_processes=args.processes, device_limits={**DEVICE_IO_LIMITS, **dict(args.device_limit)}, backend=args.digest)
+    scanner = DuplicateScanner(hash_engine,
+                               None if args.no_index else args.index, filters, similar_images=args.similar_images, similar_hash=args.similar_hash,
+                               resume=not args.restart, trace=trace if args.trace else None)
+    similar_mode = args.similar_images is not None
+
+    # Paths that aren't valid UTF-8 keep their bytes (as stdout does them on POSIX) instead of failing the write
+    stream = open(args.output, "w", newline="", encoding="utf-8", errors="surrogateescape") if args.output else sys.stdout
+    writer = _Writer(stream, args.format, PLAN_FIELDS if planning else GROUP_FIELDS + ["kind"] * similar_mode)
+    found = False; failed = False; freed = 0; reports = []
+    reclaimer = None
+    if args.delete and not args.dry_run:
+        reclaimer = Reclaimer(args.action, args.digest, args.journal_dir, args.quarantine_dir).__enter__()
+    try:
+        for roots in ([args.roots] if args.together else [[root] for root in args.roots]):
+            root = os.pathsep.join(roots); group_count = [0]
+            def on_group(digest, paths, files, root=root):
+                nonlocal found, failed, freed
+                found = True; group_count[0] += 1
+                if not planning:
+                    write_group(root, digest, paths, files, "exact")
+                    return
+                for entry in plan_group(digest, paths, files, args.keep):
+                    entry["root"] = root; entry["action"] = args.action; entry["status"] = "planned"
+                    if reclaimer:
+                        try: freed += reclaimer.apply(entry); entry["status"] = DONE_STATUS[args.action]
+                        except (OSError, VerificationError) as e: entry["status"] = f"error: {e}"; failed = True
+                    writer.write(entry)
+            def write_group(root, digest, paths, files, kind):
+                extra = {"kind": kind} if similar_mode else {}
+                if args.format == "csv":
+                    for path in paths: writer.write({"root": root, "group": group_count[0], "digest": digest, "size": files[path].st_size, "path": path, **extra})
+                elif kind == "similar": writer.write({"root": root, "group": group_count[0], "digest": digest, "sizes": [files[path].st_size for path in paths], "paths": paths, **extra})
+                else: writer.write({"root": root, "group": group_count[0], "digest": digest, "size": files[paths[0]].st_size, "paths": paths, **extra})
+            def on_similar(key, paths, files, root=root):
+                nonlocal found
+                found = True; group_count[0] += 1
+                if not planning: write_group(root, key, paths, files, "similar")
+            try: result = scanner.scan(roots, on_group, on_similar)
+            except ValueError as e: say(f"{root}: {e}"); return EXIT_ERROR
+            extra = sum(len(paths) - 1 for paths in result.duplicates.values())
+            wasted = reclaimable_bytes(plan_deletion(result.duplicates, result.files, args.keep), result.hardlinks)
+            say(f"{', '.join(result.roots)}: {len(result.duplicates)} set(s), {extra} duplicate file(s), {format_size(wasted)} reclaimable, {len(result.files)} file(s) scanned")
+            if similar_mode: say(f"{', '.join(result.roots)}: {len(result.similar_images)} set(s) of similar images" + (" (listed only, not deleted)" if planning and result.similar_images else ""))
+            say(format_stage_stats(result.stats))
+            reports.append(result.report())
+    except KeyboardInterrupt:
+        say("Interrupted." + ("" if args.no_index else " Run the same command again to resume.")); return EXIT_INTERRUPTED
+    except OutputError as e: say(str(e)); return EXIT_ERROR
+    finally:
+        scanner.hash_engine.shutdown()
+        if reclaimer:
+            reclaimer.__exit__(None, None, None)
+            say(f"{args.action}: {format_size(freed)} reclaimed, " + (f"undo journal {reclaimer.journal_path}" if reclaimer.changed else "nothing changed"))
+        if args.output:
+            try: stream.close()
+            except OSError: pass # records are flushed as they are written, so this is a failed write already reported
+        if args.report: write_report(args.report, reports)
+    if failed: return EXIT_DELETE_FAILED
+    return EXIT_DUPLICATES_FOUND if found else EXIT_NO_DUPLICATES
@@ -0,0 +1,1027 @@
+"""Scan engine for Duplicate Detective: walking, staged hashing, the hash index and delete plans.
+
+Nothing here imports the GUI stack, so it can run headless (see cli.py).
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import sqlite3
+import mmap
+import stat
+import fnmatch
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .metrics import ScanMetrics
+from .perceptual import (IMAGE_BATCH_SIZE, IMAGE_EXTENSIONS, NEAR_DUPLICATE_HASH, PERCEPTUAL_HASHES, PERCEPTUAL_VERSION,
+                         available as perceptual_available, group_similar, hash_thumbnails, image_thumbnail, pack_hashes, unpack_hashes)
+# --- Optional fast hashing ---
+try: import xxhash # pip install xxhash (optional, much faster than the built-in hashes)
+except ImportError: xxhash = None
+
+# Progress and errors go to logging (the CLI sends them to stderr, so they never mix with its output).
+# Per-file read errors are DEBUG: a big scan can hit thousands; the scan logs one WARNING with the count.
+log = logging.getLogger(__name__)
+
+def parse_device_limit(text):
+    """'D:\\=1' -> ('D:\\', 1): a path on the drive and the files read from it at once. Raises ValueError otherwise."""
+    path, separator, limit = text.rpartition("=")
+    if not separator or not path.strip(): raise ValueError(f"expected PATH=N, got '{text}'")
+    return path.strip(), int(limit)
+
+def _device_limits_from_env(text):
+    limits = {}
+    for item in filter(None, (item.strip() for item in text.split(os.pathsep))):
+        try: path, limit = parse_device_limit(item); limits[path] = limit
+        except ValueError as e: log.warning(f"Ignoring DUPLICATE_DETECTIVE_DEVICE_LIMITS entry: {e}")
+    return limits
+
+# --- Scan Settings ---
+PARTIAL_HASH_SAMPLE_SIZE = 4096 # Bytes read from the head and the tail of a file for the partial hash
+# Where the hash index lives; set DUPLICATE_DETECTIVE_INDEX to move it (an empty value turns it off).
+DEFAULT_INDEX_PATH = os.environ.get("DUPLICATE_DETECTIVE_INDEX", os.path.join(os.path.expanduser("~"), ".duplicate_detective", "hash_index.sqlite3"))
+# Files hashed at the same time (DUPLICATE_DETECTIVE_WORKERS); 1 hashes one file after another.
+HASH_WORKERS = int(os.environ.get("DUPLICATE_DETECTIVE_WORKERS", min(8, os.cpu_count() or 1)))
+# Hash in worker processes instead of threads (DUPLICATE_DETECTIVE_PROCESSES=1). Threads are usually enough: hashlib releases the GIL.
+USE_PROCESS_POOL = os.environ.get("DUPLICATE_DETECTIVE_PROCESSES") == "1"
+# Max files read at once per drive, e.g. DUPLICATE_DETECTIVE_DEVICE_LIMITS="D:\=1;E:\=2" (PATH=N, separated like PATH)
+# for spinning disks. Drives not listed get HASH_WORKERS (or 1 if Linux reports the disk as rotational).
+DEVICE_IO_LIMITS = _device_limits_from_env(os.environ.get("DUPLICATE_DETECTIVE_DEVICE_LIMITS", ""))
+READ_BUFFER_SIZE = 1024 * 1024 # Bytes per read when hashing a whole file
+MMAP_THRESHOLD = 64 * 1024 * 1024 # Files at least this big are memory-mapped instead of read
+READ_STRATEGY = "auto" # "auto" (mmap for big files), "readinto" or "mmap"
+HASH_CHUNK_SIZE = 4096 # Files handed to the hashing engine at once; bounds the per-file bookkeeping held in memory
+INDEX_FLUSH_SIZE = 10000 # New hash index entries kept in memory before they are written out
+CHECKPOINT_INTERVAL = 30 # Seconds between snapshots of a running scan (walk frontier + hashes so far)
+CHECKPOINT_MAX_AGE = 24 * 3600 # Seconds an interrupted scan can be resumed for; older snapshots are rescanned
+
+# --- Digest Backends ---
+# Name -> hash object factory. Cached hashes are tagged with the name, so switching never mixes results.
+DIGEST_BACKENDS = {
+    "md5": hashlib.md5,
+    "blake2b": lambda: hashlib.blake2b(digest_size=16),
+    "blake2s": lambda: hashlib.blake2s(digest_size=16),
+}
+if xxhash:
+    DIGEST_BACKENDS["xxh3_64"] = xxhash.xxh3_64
+    DIGEST_BACKENDS["xxh3_128"] = xxhash.xxh3_128
+# DUPLICATE_DETECTIVE_DIGEST picks the backend; otherwise xxh3_128 if xxhash is installed, else md5
+# (OpenSSL's MD5 usually beats BLAKE2 - run benchmarks/digest_backends.py to check on your machine).
+DIGEST_BACKEND = os.environ.get("DUPLICATE_DETECTIVE_DIGEST", "xxh3_128" if xxhash else "md5")
+if DIGEST_BACKEND not in DIGEST_BACKENDS: log.warning(f"Unknown digest backend '{DIGEST_BACKEND}', using md5"); DIGEST_BACKEND = "md5"
+
+# --- Hashing ---
+# Module-level (not methods) so a process pool can pickle them.
+_thread_buffers = threading.local()
+
+def _read_buffer():
+    """A reusable READ_BUFFER_SIZE buffer for this thread (saves an allocation per read)."""
+    view = getattr(_thread_buffers, "view", None)
+    if view is None: view = _thread_buffers.view = memoryview(bytearray(READ_BUFFER_SIZE))
+    return view
+
+def file_digest(file_path, file_size=None, backend=DIGEST_BACKEND, strategy=READ_STRATEGY):
+    """Raw digest (bytes) of the whole file, or None if it can't be read."""
+    hasher = DIGEST_BACKENDS[backend]()
+    try:
+        with open(file_path, "rb", buffering=0) as f:
+            if file_size is None: file_size = os.fstat(f.fileno()).st_size
+            if file_size > 0 and (strategy == "mmap" or (strategy == "auto" and file_size >= MMAP_THRESHOLD)):
+                try:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped: hasher.update(mapped)
+                    return hasher.digest()
+                except (OSError, ValueError) as e: log.debug(f"mmap failed for {file_path}, reading instead: {e}"); hasher = DIGEST_BACKENDS[backend]()
+            view = _read_buffer()
+            while True:
+                count = f.readinto(view)
+                if not count: break
+                hasher.update(view[:count])
+        return hasher.digest()
+    except Exception as e:
+        log.debug(f"Error hashing {file_path}: {e}")
+        return None
+
+def file_sample_digest(file_path, file_size, backend=DIGEST_BACKEND):
+    """Raw digest of a small head/tail sample of a file (cheap pre-filter before a full hash)."""
+    hasher = DIGEST_BACKENDS[backend]()
+    try:
+        with open(file_path, "rb") as f:
+            hasher.update(f.read(PARTIAL_HASH_SAMPLE_SIZE))
+            if file_size > PARTIAL_HASH_SAMPLE_SIZE:
+                f.seek(max(PARTIAL_HASH_SAMPLE_SIZE, file_size - PARTIAL_HASH_SAMPLE_SIZE))
+                hasher.update(f.read(PARTIAL_HASH_SAMPLE_SIZE))
+        return hasher.digest()
+    except Exception as e:
+        log.debug(f"Error hashing {file_path}: {e}")
+        return None
+
+def hash_file(file_path, file_size=None, backend=DIGEST_BACKEND, strategy=READ_STRATEGY):
+    """Hex digest of the whole file, or None if it can't be read."""
+    digest = file_digest(file_path, file_size, backend, strategy)
+    return digest.hex() if digest is not None else None
+
+def hash_file_sample(file_path, file_size, backend=DIGEST_BACKEND):
+    """Hex digest of the head/tail sample, or None if it can't be read."""
+    digest = file_sample_digest(file_path, file_size, backend)
+    return digest.hex() if digest is not None else None
+
+def _is_rotational(device):
+    """Best effort (Linux only): True if `device` is a spinning disk."""
+    try:
+        sys_path = os.path.realpath(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+        for candidate in (sys_path, os.path.dirname(sys_path)): # partitions keep `queue/` on the parent disk
+            flag = os.path.join(candidate, "queue", "rotational")
+            if os.path.exists(flag):
+                with open(flag) as f: return f.read().strip() == "1"
+    except (AttributeError, OSError, ValueError): pass
+    return False
+
+class ScanCancelled(Exception):
+    """Raised in the scan thread once the user has cancelled the scan."""
+
+class HashingEngine:
+    """Hashes files on a thread (or process) pool while capping concurrent reads per device.
+
+    Results are identical to hashing the same jobs one after another.
+    """
+    def __init__(self, workers=HASH_WORKERS, use_processes=USE_PROCESS_POOL, device_limits=DEVICE_IO_LIMITS, cancel_event=None, backend=DIGEST_BACKEND):
+        self.workers = max(1, workers)
+        self.backend = backend
+        self.use_processes = use_processes
+        self.cancel_event = cancel_event or threading.Event()
+        self.executor = None
+        self.device_limits = {} # st_dev -> max files in flight
+        for path, limit in device_limits.items():
+            try: self.device_limits[os.stat(path).st_dev] = max(1, limit)
+            except OSError as e: log.warning(f"Ignoring I/O limit for {path}: {e}")
+
+    def device_limit(self, device):
+        if device not in self.device_limits: self.device_limits[device] = 1 if _is_rotational(device) else self.workers
+        return self.device_limits[device]
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set(): raise ScanCancelled()
+
+    def run(self, jobs, on_result=None):
+        """Runs jobs of (func, path, stat) and returns {path: func(path, stat.st_size, backend)}.
+
+        With on_result, on_result(path, result) is called in the calling thread as each job
+        finishes instead (and nothing is collected).
+        """
+        results = {}
+        if not on_result: on_result = results.__setitem__
+        if self.workers == 1 or len(jobs) < 2:
+            for func, path, st in jobs:
+                self.check_cancelled(); on_result(path, func(path, st.st_size, self.backend))
+            return results
+
+        if self.executor is None:
+            if self.use_processes:
+                from concurrent.futures import ProcessPoolExecutor # pulls in multiprocessing; only pay for it when used
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            else: self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        queues = {}
+        for job in jobs: queues.setdefault(job[2].st_dev, deque()).append(job)
+        futures = {}; in_flight = dict.fromkeys(queues, 0)
+        try:
+            while queues or futures:
+                self.check_cancelled()
+                # Top up the pool round-robin across devices, never past a device's limit.
+                for device in list(queues):
+                    queue = queues[device]
+                    while queue and len(futures) < 2 * self.workers and in_flight[device] < self.device_limit(device):
+                        func, path, st = queue.popleft()
+                        futures[self.executor.submit(func, path, st.st_size, self.backend)] = (path, device); in_flight[device] += 1
+                    if not queue: del queues[device]
+                done, _ = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, device = futures.pop(future); in_flight[device] -= 1
+                    on_result(path, future.result())
+        except BaseException:
+            for future in futures: future.cancel()
+            raise
+        return results
+
+    def shutdown(self):
+        """Stops the pool; queued jobs are dropped, running ones finish.
+
+        A process pool is waited for (its manager thread and pipes must be gone before the
+        interpreter exits, or it reports "Bad file descriptor" at exit) unless the scan was
+        cancelled, where returning at once matters more.
+        """
+        if not self.executor: return
+        self.executor.shutdown(wait=self.use_processes and not self.cancel_event.is_set(), cancel_futures=True); self.executor = None
+
+# --- Directory Walking ---
+def parse_size(text):
+    """'1.5 MB' -> 1572864. Empty text -> None. Raises ValueError on anything else."""
+    text = text.strip().upper().replace(" ", "")
+    if not text: return None
+    for unit, factor in (("GB", 1024**3), ("MB", 1024**2), ("KB", 1024), ("B", 1)):
+        if text.endswith(unit): return int(float(text[:-len(unit)]) * factor)
+    return int(float(text))
+
+def parse_globs(text):
+    """'*.package; *.ts4script' -> ['*.package', '*.ts4script']"""
+    return [pattern.strip() for pattern in text.replace(";", ",").split(",") if pattern.strip()]
+
+def _matches(patterns, name, relative_path):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+
+def list_directory(directory, root, include=(), exclude=(), min_size=0, max_size=None, metrics=None):
+    """One step of a walk: ([(path, stat)] of the matching files in `directory`, [its subfolders]).
+
+    Uses os.scandir so each file costs at most one stat (none on Windows, where the
+    directory listing already carries it). Symlinks are skipped. `exclude` globs prune
+    whole folders as well as files; globs match the name or the path relative to `root`.
+    With `metrics` (a ScanMetrics in its "walk" phase), stat time is booked to "stat" and the
+    listing and stat calls are counted.
+    """
+    files = []; subdirs = []; stat_calls = 0; stat_seconds = 0.0
+    globs = bool(include or exclude); skip = len(os.path.join(root, "")) # entry.path[skip:] is relative to root
+    if metrics: metrics.count("directories"); metrics.count("syscalls.scandir")
+    try:
+        with os.scandir(directory) as it: entries = list(it)
+    except OSError as e:
+        log.warning(f"Error reading folder {directory}: {e}")
+        if metrics: metrics.count("read_errors")
+        return files, subdirs
+    for entry in entries:
+        relative_path = entry.path[skip:].replace(os.sep, "/") if globs else None
+        if exclude and _matches(exclude, entry.name, relative_path): continue
+        try:
+            if entry.is_dir(follow_symlinks=False): subdirs.append(entry.path); continue
+            if not entry.is_file(follow_symlinks=False): continue
+            if include and not _matches(include, entry.name, relative_path): continue
+            stat_calls += 1; started = time.perf_counter()
+            st = entry.stat(follow_symlinks=False)
+            stat_seconds += time.perf_counter() - started
+        except OSError as e:
+            log.debug(f"Error reading {entry.path}: {e}")
+            if metrics: metrics.count("read_errors")
+            continue
+        if st.st_size < min_size or (max_size is not None and st.st_size > max_size): continue
+        files.append((entry.path, st))
+    if metrics:
+        metrics.add_time("stat", stat_seconds, parent="walk")
+        if os.name != "nt": metrics.count("syscalls.stat", stat_calls)
+    return files, subdirs
+
+def walk_files(root, include=(), exclude=(), min_size=0, max_size=None, cancel_check=None):
+    """Yields (path, stat) for every regular file below `root`, in os.walk's top-down order (see list_directory)."""
+    stack = [root]
+    while stack:
+        if cancel_check: cancel_check()
+        files, subdirs = list_directory(stack.pop(), root, include, exclude, min_size, max_size)
+        yield from files
+        stack.extend(reversed(subdirs))
+
+def normalize_roots(folders):
+    """Absolute, symlink-free scan roots in the given order, minus repeats and folders inside another root.
+
+    Overlapping roots would otherwise be walked twice and every file in the overlap would
+    show up as its own duplicate.
+    """
+    roots = [os.path.realpath(os.path.normpath(folder)) for folder in folders]
+    keys = [os.path.join(os.path.normcase(root), "") for root in roots]
+    return [root for i, root in enumerate(roots)
+            if not any(keys[i].startswith(keys[j]) and (keys[i] != keys[j] or j < i) for j in range(len(roots)) if j != i)]
+
+# --- File Table ---
+class FileRecord:
+    """The stat fields a scan keeps for one file; reads like the os.stat_result it came from."""
+    __slots__ = ("st_size", "st_dev", "st_ino", "st_mtime_ns")
+    def __init__(self, st_size, st_dev, st_ino, st_mtime_ns):
+        self.st_size = st_size; self.st_dev = st_dev; self.st_ino = st_ino; self.st_mtime_ns = st_mtime_ns
+
+    def __repr__(self):
+        return f"FileRecord(st_size={self.st_size}, st_dev={self.st_dev}, st_ino={self.st_ino}, st_mtime_ns={self.st_mtime_ns})"
+
+class FileTable(Mapping):
+    """Compact store of scanned files in walk order; reads like {path: stat} (values are FileRecords).
+
+    Files are rows: each keeps an interned folder id and its own name, and size/device/inode/mtime
+    live in typed arrays. A file costs ~150 bytes instead of ~1.4 KB for a path string plus an
+    os.stat_result, and the scan can work on row numbers (walk order) instead of paths.
+    """
+    def __init__(self, items=()):
+        self.folders = []; self._folder_ids = {} # folder path <-> folder id
+        self._prefixes = []; self._prefix_ids = {} # folder id <-> os.path.join(folder, ""), so a path is one concatenation
+        self._rows_in_folder = [] # folder id -> {name: row}
+        self.folder_ids = array("I"); self.names = []
+        self.sizes = array("q"); self.inodes = array("Q"); self.mtimes = array("q")
+        self.devices = []; self._device_ids = {}; self.device_ids = array("I")
+        self._big_inodes = {} # row -> inode, for the rare file systems with inodes past 64 bits
+        for path, st in items: self.add(path, st)
+
+    def add(self, path, st):
+        """Appends a file and returns its row."""
+        folder, name = os.path.split(path)
+        return self._append(self._folder_id(folder), name, st)
+
+    def add_listing(self, folder, found):
+        """add() for a whole list_directory(folder) result ([(path, stat)]): names are sliced off, not split out."""
+        folder_id = self._folder_id(folder); skip = len(self._prefixes[folder_id])
+        for path, st in found: self._append(folder_id, path[skip:], st)
+
+    def _folder_id(self, folder):
+        folder_id = self._folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self._folder_ids[folder] = len(self.folders)
+            self.folders.append(folder); self._rows_in_folder.append({})
+            self._prefixes.append(os.path.join(folder, "")); self._prefix_ids[self._prefixes[-1]] = folder_id
+        return folder_id
+
+    def _append(self, folder_id, name, st):
+        row = len(self.names)
+        self.folder_ids.append(folder_id); self.names.append(name); self._rows_in_folder[folder_id][name] = row
+        self.sizes.append(st.st_size); self.mtimes.append(st.st_mtime_ns); self.device_ids.append(self._device_id(st.st_dev))
+        if st.st_ino < 2**64: self.inodes.append(st.st_ino)
+        else: self.inodes.append(0); self._big_inodes[row] = st.st_ino
+        return row
+
+    def _device_id(self, device):
+        device_id = self._device_ids.get(device)
+        if device_id is None: device_id = self._device_ids[device] = len(self.devices); self.devices.append(device)
+        return device_id
+
+    def set_stat(self, row, st):
+        device_id = self._device_id(st.st_dev)
+        self.sizes[row] = st.st_size; self.mtimes[row] = st.st_mtime_ns; self.device_ids[row] = device_id
+        if st.st_ino < 2**64: self.inodes[row] = st.st_ino
+        else: self.inodes[row] = 0; self._big_inodes[row] = st.st_ino
+
+    def path(self, row):
+        return self._prefixes[self.folder_ids[row]] + self.names[row]
+
+    def inode(self, row):
+        return self._big_inodes.get(row, self.inodes[row])
+
+    def key(self, row):
+        """(device, inode, size, mtime_ns) of a row: what the hash index checks, without building a FileRecord."""
+        return self.devices[self.device_ids[row]], self.inode(row), self.sizes[row], self.mtimes[row]
+
+    def record(self, row):
+        return FileRecord(self.sizes[row], self.devices[self.device_ids[row]], self.inode(row), self.mtimes[row])
+
+    def row_of(self, path):
+        """Row of `path`, or None if it isn't in the table."""
+        cut = path.rfind(os.sep) + 1
+        folder_id = self._prefix_ids.get(path[:cut])
+        if folder_id is not None: return self._rows_in_folder[folder_id].get(path[cut:])
+        folder, name = os.path.split(path) # not built like path() builds them, e.g. doubled or alternative separators
+        folder_id = self._folder_ids.get(folder)
+        return None if folder_id is None else self._rows_in_folder[folder_id].get(name)
+
+    def __getitem__(self, path):
+        row = self.row_of(path)
+        if row is None: raise KeyError(path)
+        return self.record(row)
+
+    def __contains__(self, path):
+        return self.row_of(path) is not None
+
+    def __iter__(self):
+        return map(self.path, range(len(self.names)))
+
+    def __len__(self):
+        return len(self.names)
+
+    def to_parts(self, start=0, start_folder=0):
+        """The table as {part name: bytes} (for scan checkpoints): arrays raw, paths NUL-separated.
+
+        With `start`/`start_folder`, the row and folder parts (ROW_PARTS) only hold the rows and
+        folders from there on, to append to an earlier snapshot; devices and big inodes are whole.
+        """
+        def text(strings): return "\0".join(strings).encode("utf-8", "surrogatepass")
+        return {"folders": text(self.folders[start_folder:]), "names": text(self.names[start:]), "folder_ids": self.folder_ids[start:].tobytes(),
+                "sizes": self.sizes[start:].tobytes(), "inodes": self.inodes[start:].tobytes(), "mtimes": self.mtimes[start:].tobytes(),
+                "device_ids": self.device_ids[start:].tobytes(),
+                "devices": json.dumps(self.devices).encode(), "big_inodes": json.dumps(list(self._big_inodes.items())).encode()}
+
+    ROW_PARTS = ("folders", "names", "folder_ids", "sizes", "inodes", "mtimes", "device_ids")
+
+    @staticmethod
+    def join_parts(pieces):
+        """Parts of consecutive to_parts() slices ([{part: bytes}], oldest first) -> parts of the whole table."""
+        parts = dict(pieces[-1])
+        for name in FileTable.ROW_PARTS:
+            values = [piece[name] for piece in pieces]
+            parts[name] = b"\0".join(value for value in values if value) if name in ("folders", "names") else b"".join(values)
+        return parts
+
+    @classmethod
+    def from_parts(cls, parts):
+        """Rebuilds a table written by to_parts() on this machine."""
+        def text(data): return data.decode("utf-8", "surrogatepass").split("\0") if data else []
+        table = cls()
+        table.folders = text(parts["folders"]); table.names = text(parts["names"])
+        for name in ("folder_ids", "sizes", "inodes", "mtimes", "device_ids"): getattr(table, name).frombytes(parts[name])
+        table.devices = json.loads(parts["devices"]); table._big_inodes = dict(json.loads(parts["big_inodes"]))
+        table._folder_ids = {folder: folder_id for folder_id, folder in enumerate(table.folders)}
+        table._prefixes = [os.path.join(folder, "") for folder in table.folders]
+        table._prefix_ids = {prefix: folder_id for folder_id, prefix in enumerate(table._prefixes)}
+        table._device_ids = {device: device_id for device_id, device in enumerate(table.devices)}
+        table._rows_in_folder = [{} for _ in table.folders]
+        for row, (folder_id, name) in enumerate(zip(table.folder_ids, table.names)): table._rows_in_folder[folder_id][name] = row
+        return table
+
+# --- Persistent Hash Index ---
+def _raw_digest(value):
+    return bytes.fromhex(value) if isinstance(value, str) else value
+
+def _path_range(root):
+    """(low, high) BLOB bounds of the index paths below `root`."""
+    prefix = os.fsencode(os.path.join(root, ""))
+    return prefix, prefix[:-1] + bytes([prefix[-1] + 1])
+
+class HashIndex:
+    """SQLite cache of partial/full digests so a rescan only re-reads new or changed files.
+
+    Rows are keyed by path and only trusted while (device, inode, size, mtime_ns) still match
+    and the digests were made with the same backend as this scan. Digests are stored raw
+    (BLOB); hex text left by older versions is converted as it is read. Paths are stored as
+    their file system bytes (os.fsencode, BLOB), so names that aren't valid UTF-8 fit too;
+    older indexes' TEXT paths are converted when opened. Perceptual image hashes (see
+    perceptual.py) live in a table of their own, `images`.
+    """
+    def __init__(self, db_path, backend=DIGEST_BACKEND):
+        self.db_path = db_path; self.backend = backend
+        if os.path.dirname(db_path): os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (path BLOB PRIMARY KEY, device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, partial_hash TEXT, full_hash TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS images (path BLOB PRIMARY KEY, device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, hashes BLOB)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS checkpoints (key TEXT, part TEXT, saved REAL, value BLOB, PRIMARY KEY (key, part))")
+        if "backend" not in [row[1] for row in self.conn.execute("PRAGMA table_info(files)")]:
+            self.conn.execute("ALTER TABLE files ADD COLUMN backend TEXT"); self.conn.execute("UPDATE files SET backend = 'md5'") # older indexes were always MD5
+        if not self.conn.execute("SELECT 1 FROM meta WHERE key = 'path_format' AND value = 'bytes'").fetchone():
+            for table in ("files", "images"): # TEXT paths of older indexes -> their UTF-8 bytes, which is what os.fsencode gives for them
+                self.conn.execute(f"UPDATE OR REPLACE {table} SET path = CAST(path AS BLOB) WHERE typeof(path) = 'text'")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('path_format', 'bytes')")
+        self._check_setting("partial_sample_size", str(PARTIAL_HASH_SAMPLE_SIZE), ["partial_hash"])
+        self._check_setting("perceptual_version", PERCEPTUAL_VERSION, ["hashes"], table="images")
+        self.conn.commit()
+        self.entries = {}; self.dirty = {}
+        self.image_entries = {}; self.dirty_images = {}
+
+    def _check_setting(self, key, value, columns, table="files"):
+        """Forgets cached digests in `columns` when the setting they were made with has changed."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        if row and row[0] == value: return
+        if row:
+            log.info(f"Hash index: '{key}' changed, dropping cached {', '.join(columns)}")
+            self.conn.execute(f"UPDATE {table} SET {', '.join(f'{column} = NULL' for column in columns)}")
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def prefetch(self, paths):
+        """Reads the entries for `paths` (batched primary-key lookups), replacing the previous batch.
+
+        Only one batch is held in memory, so the scan asks for one hashing chunk at a time.
+        """
+        paths = list(map(os.fsencode, paths)); self.entries = {}
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            rows = self.conn.execute(f"SELECT path, device, inode, size, mtime_ns, partial_hash, full_hash FROM files WHERE backend = ? AND path IN ({', '.join('?' * len(batch))})", [self.backend] + batch)
+            for path, device, inode, size, mtime_ns, partial_hash, full_hash in rows:
+                self.entries[os.fsdecode(path)] = (device, inode, size, mtime_ns, _raw_digest(partial_hash), _raw_digest(full_hash))
+
+    def lookup(self, path, st):
+        """Returns (partial_hash, full_hash) for `path`, or (None, None) if it is unknown or changed.
+
+        Sees entries stored since the last commit and the last prefetch()ed batch.
+        """
+        return self.lookup_key(path, (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns))
+
+    def lookup_key(self, path, key):
+        """lookup() for a (device, inode, size, mtime_ns) tuple, e.g. FileTable.key()."""
+        entry = self.dirty.get(path) or self.entries.get(path)
+        if entry and entry[:4] == key: return entry[4], entry[5]
+        return None, None
+
+    def store(self, path, st, partial_hash=None, full_hash=None):
+        old_partial, old_full = self.lookup(path, st)
+        self.dirty[path] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, partial_hash or old_partial, full_hash or old_full)
+        if len(self.dirty) >= INDEX_FLUSH_SIZE: self.commit()
+
+    def prefetch_images(self, paths):
+        """Like prefetch(), for perceptual hashes."""
+        paths = list(map(os.fsencode, paths)); self.image_entries = {}
+        for start in range(0, len(paths), 500):
+            batch = paths[start:start + 500]
+            rows = self.conn.execute(f"SELECT path, device, inode, size, mtime_ns, hashes FROM images WHERE hashes IS NOT NULL AND path IN ({', '.join('?' * len(batch))})", batch)
+            for path, *entry in rows: self.image_entries[os.fsdecode(path)] = tuple(entry)
+
+    def lookup_image(self, path, st):
+        """Returns the packed perceptual hashes of `path` (b"" = not a decodable image), or None if unknown or changed."""
+        entry = self.dirty_images.get(path) or self.image_entries.get(path)
+        if entry and entry[:4] == (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns): return entry[4]
+        return None
+
+    def store_image(self, path, st, hashes):
+        self.dirty_images[path] = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, hashes)
+        if len(self.dirty_images) >= INDEX_FLUSH_SIZE: self.commit()
+
+    def prune(self, root, seen_paths, check_missing=False):
+        """Drops entries below `root` that the scan didn't see (deleted or moved files); one range query per table.
+
+        With `check_missing` (for scans whose filters skipped files that still exist), an
+        unseen entry is only dropped if its file is really gone.
+        """
+        stale_count = 0
+        for table, entries, dirty in (("files", self.entries, self.dirty), ("images", self.image_entries, self.dirty_images)):
+            rows = self.conn.execute(f"SELECT path FROM {table} WHERE path >= ? AND path < ?", _path_range(root))
+            stale = [path for path in map(os.fsdecode, (raw for (raw,) in rows)) if path not in seen_paths and not (check_missing and os.path.isfile(path))]
+            self.conn.executemany(f"DELETE FROM {table} WHERE path = ?", ((os.fsencode(path),) for path in stale))
+            for path in stale: entries.pop(path, None); dirty.pop(path, None)
+            stale_count += len(stale)
+        return stale_count
+
+    def prune_missing(self):
+        """Drops every entry (any root) whose file no longer exists."""
+        stale_count = 0
+        for table in ("files", "images"):
+            stale = [path for (path,) in self.conn.execute(f"SELECT path FROM {table}") if not os.path.isfile(os.fsdecode(path))]
+            self.conn.executemany(f"DELETE FROM {table} WHERE path = ?", ((path,) for path in stale))
+            stale_count += len(stale)
+        self.conn.commit()
+        return stale_count
+
+    def commit(self):
+        """Writes pending entries out. They stay visible to lookup() until the next prefetch, so a later
+        store() for the same file (its full hash after its partial one) still keeps both digests."""
+        self.entries.update(self.dirty); self.image_entries.update(self.dirty_images)
+        self.conn.executemany("INSERT OR REPLACE INTO files (path, device, inode, size, mtime_ns, partial_hash, full_hash, backend) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", ((os.fsencode(path),) + entry + (self.backend,) for path, entry in self.dirty.items()))
+        self.conn.executemany("INSERT OR REPLACE INTO images (path, device, inode, size, mtime_ns, hashes) VALUES (?, ?, ?, ?, ?, ?)", ((os.fsencode(path),) + entry for path, entry in self.dirty_images.items()))
+        self.conn.commit(); self.dirty.clear(); self.dirty_images.clear()
+
+    def save_checkpoint(self, key, parts, replace=True):
+        """Commits pending hashes, then stores `parts` under `key` (and drops expired snapshots).
+
+        With replace=False the parts are added to what `key` already has (same-named parts are
+        overwritten) instead of replacing it.
+        """
+        self.commit(); now = time.time()
+        if replace: self.conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,))
+        else: self.conn.execute("UPDATE checkpoints SET saved = ? WHERE key = ?", (now, key))
+        self.conn.execute("DELETE FROM checkpoints WHERE saved < ?", (now - CHECKPOINT_MAX_AGE,))
+        self.conn.executemany("INSERT OR REPLACE INTO checkpoints (key, part, saved, value) VALUES (?, ?, ?, ?)", ((key, part, now, value) for part, value in parts.items()))
+        self.conn.commit()
+
+    def load_checkpoint(self, key):
+        """{part: bytes} saved under `key`, or None if there is none younger than CHECKPOINT_MAX_AGE."""
+        rows = self.conn.execute("SELECT part, value FROM checkpoints WHERE key = ? AND saved >= ?", (key, time.time() - CHECKPOINT_MAX_AGE)).fetchall()
+        return dict(rows) if rows else None
+
+    def clear_checkpoint(self, key):
+        self.conn.execute("DELETE FROM checkpoints WHERE key = ?", (key,)); self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+# --- Scan Checkpoints ---
+class ScanCheckpoint:
+    """Snapshots of a running scan in the hash index, so an interrupted scan resumes instead of restarting.
+
+    A snapshot is the walk frontier (folders still to list, with their roots) plus the files
+    found so far. Files only ever get appended during the walk, so each snapshot stores just
+    the rows added since the one before, as parts numbered "names.0", "names.1", ...: saving
+    costs the new rows, not the whole table. Hashes need no snapshot of their own - the index
+    already keeps them - they are just committed along with it, so a resumed scan finds every
+    file hashed before the interruption in the index. Keyed by roots and filters: any other
+    scan starts fresh.
+    """
+    def __init__(self, index, roots, filters, interval=CHECKPOINT_INTERVAL, metrics=None):
+        self.index = index; self.interval = interval
+        self.metrics = metrics or ScanMetrics() # time spent saving goes to its "checkpoint" phase
+        self.key = json.dumps({"roots": roots, "filters": filters}, sort_keys=True, default=list)
+        self.last_save = time.monotonic()
+        self.walk_saved = False # the finished walk is stored; later snapshots only commit hashes
+        self.saved = (None, 0, 0, 0) # (table, rows, folders, pieces) already stored
+
+    def load(self):
+        """(FileTable, frontier) of an interrupted scan with the same roots and filters, or None."""
+        stored = self.index.load_checkpoint(self.key)
+        if not stored: return None
+        try:
+            pieces = {}
+            for part, value in stored.items():
+                name, _, number = part.partition(".")
+                if number: pieces.setdefault(int(number), {})[name] = value
+            parts = FileTable.join_parts([pieces[number] for number in range(len(pieces))])
+            return FileTable.from_parts(parts), [tuple(entry) for entry in json.loads(stored["frontier"])]
+        except (KeyError, ValueError, IndexError) as e: log.warning(f"Ignoring unreadable scan checkpoint: {e}"); return None
+
+    def save(self, files, frontier):
+        """Stores `files` and `frontier` ([(root, folder)] still to walk; empty once the walk is done)."""
+        with self.metrics.phase("checkpoint"):
+            if self.walk_saved and not frontier: self.index.commit()
+            else:
+                _, rows, folders, pieces = self.saved if self.saved[0] is files else (files, 0, 0, 0)
+                parts = {f"{name}.{pieces}": value for name, value in files.to_parts(rows, folders).items()}
+                parts["frontier"] = json.dumps(frontier).encode()
+                self.index.save_checkpoint(self.key, parts, replace=not pieces)
+                self.saved = (files, len(files), len(files.folders), pieces + 1); self.walk_saved = not frontier
+        self.last_save = time.monotonic()
+
+    def tick(self, files, frontier=()):
+        """save() if the last snapshot is more than `interval` seconds old; cheap enough to call per file."""
+        if time.monotonic() - self.last_save >= self.interval: self.save(files, list(frontier))
+
+    def clear(self):
+        self.index.clear_checkpoint(self.key)
+
+# --- Results ---
+def format_size(size_bytes):
+    if size_bytes < 1024: return f"{size_bytes} B"
+    elif size_bytes < 1024**2: return f"{size_bytes/1024:.1f} KB"
+    elif size_bytes < 1024**3: return f"{size_bytes/1024**2:.1f} MB"
+    else: return f"{size_bytes/1024**3:.1f} GB"
+
+def format_stage_stats(stats):
+    """One line per stage describing how much work it saved."""
+    lines = []
+    for stage, label in (("size", "Size check"), ("hardlink", "Hard links"), ("partial", "Partial hash"), ("full", "Full hash")):
+        lines.append(f"{label}: ruled out {stats[f'{stage}_eliminated_files']} file(s), {format_size(stats[f'{stage}_eliminated_bytes'])}")
+    if stats.get("resumed_files"): lines.append(f"Resumed an interrupted scan: {stats['resumed_files']} file(s) already found")
+    if "images_compared" in stats: lines.append(f"Similar images: compared {stats['images_compared']} image(s), {stats['similar_groups']} set(s) look alike")
+    if stats.get("index_hits"): lines.append(f"Hash index: reused {stats['index_hits']} cached hash(es)")
+    lines.append(f"Hash algorithm: {stats['digest_backend']}")
+    return "\n".join(lines)
+
+class ScanResult:
+    """What a finished scan of one or more roots produced."""
+    def __init__(self, roots, files, duplicates, hardlinks, stats, similar_images=None, metrics=None):
+        self.roots = roots # normalized scan roots (see normalize_roots)
+        self.root = roots[0]
+        self.files = files # FileTable: path -> FileRecord, walk order
+        self.duplicates = duplicates # digest -> [paths], first path = first found
+        self.hardlinks = hardlinks # path in a group -> its other hard-link names
+        self.stats = stats
+        self.similar_images = similar_images or {} # "~" + perceptual hash -> [paths] of images that look alike (not identical)
+        self.metrics = metrics or ScanMetrics() # phase timings and counters (see metrics.py)
+
+    def report(self):
+        """The scan's metrics report (JSON-ready dict), with its roots and stage stats."""
+        return self.metrics.report(roots=self.roots, files=len(self.files), duplicate_sets=len(self.duplicates),
+                                   similar_sets=len(self.similar_images), stats=self.stats)
+
+# --- Delete Plans ---
+KEEP_POLICIES = ("first", "oldest", "newest", "shortest-path")
+
+def plan_group(digest, paths, files, keep="first"):
+    """Delete-plan entries for one group: every path except the one `keep` picks."""
+    if keep == "first": kept = paths[0]
+    elif keep == "oldest": kept = min(paths, key=lambda path: files[path].st_mtime_ns)
+    elif keep == "newest": kept = max(paths, key=lambda path: files[path].st_mtime_ns)
+    elif keep == "shortest-path": kept = min(paths, key=len)
+    else: raise ValueError(f"Unknown keep policy: {keep}")
+    return [{"action": "delete", "path": path, "keep": kept, "size": files[path].st_size, "digest": digest} for path in paths if path != kept]
+
+def plan_deletion(duplicates, files, keep="first"):
+    """Delete plan for every group, keeping one file per group."""
+    return [entry for digest, paths in duplicates.items() for entry in plan_group(digest, paths, files, keep)]
+
+def reclaimable_bytes(plan, hardlinks):
+    """Bytes a plan frees. A file with other hard-link names (ScanResult.hardlinks) frees none: its data stays on disk under them."""
+    return sum(entry["size"] for entry in plan if not hardlinks.get(entry["path"]))
+
+# --- Scanner ---
+class DuplicateScanner:
+    """GUI-free scan pipeline: walk -> size -> hard links -> partial hash -> full hash.
+
+    `progress(phase, files_done, files_total, bytes_done, bytes_total)` is called from the scan
+    thread as work gets done; phase is "walk" (totals are None), "partial", "full" or "images".
+
+    With `similar_images` set to a Hamming distance (bits of 64), images that look alike but
+    aren't identical are grouped too (see find_similar_images); needs Pillow.
+
+    While the hash index is on, a scan is checkpointed every CHECKPOINT_INTERVAL seconds (and
+    when it is cancelled or fails); with `resume`, a later scan of the same roots and filters
+    continues from there instead of starting over.
+
+    Each scan times its phases and counts files, bytes and system calls in `self.metrics` (a
+    fresh ScanMetrics per scan, also on the ScanResult); `trace` is passed on to it.
+    """
+    def __init__(self, hash_engine=None, index_path=DEFAULT_INDEX_PATH, filters=None, progress=None, similar_images=None, similar_hash=NEAR_DUPLICATE_HASH, resume=True, trace=None):
+        self.hash_engine = hash_engine or HashingEngine()
+        self.trace = trace
+        self.metrics = ScanMetrics(trace)
+        self.index_path = index_path # None or "" disables the hash index
+        self.filters = filters or {} # list_directory() keyword arguments
+        self.progress = progress
+        self.resume = resume
+        self.checkpoint = None # ScanCheckpoint of the running scan, if any
+        self.resumed_files = 0 # files the last scan took over from a checkpoint
+        if similar_hash not in PERCEPTUAL_HASHES: raise ValueError(f"Unknown perceptual hash '{similar_hash}' (available: {', '.join(PERCEPTUAL_HASHES)})")
+        self.similar_images = similar_images # None = exact duplicates only
+        self.similar_hash = similar_hash
+
+    def collect_files(self, roots):
+        """Walks the roots (see normalize_roots) into one FileTable, in walk order (symlinks and filtered files skipped).
+
+        With a checkpoint, the walk picks up an interrupted one's frontier and is snapshotted
+        between folders as it goes (and when it is cancelled). Files taken over from it are
+        stat'ed again first (see restat_files).
+        """
+        files = FileTable(); frontier = [(root, root) for root in reversed(roots)]
+        resumed = self.checkpoint.load() if self.checkpoint and self.resume else None
+        if resumed:
+            files, frontier = resumed
+            log.info(f"Resuming interrupted scan: {len(files)} files already found, {len(frontier)} folder(s) left to list")
+            files = self.restat_files(files)
+        self.resumed_files = len(files); total_bytes = sum(files.sizes)
+        between_folders = True # files and frontier agree (nothing half-added)
+        try:
+            with self.metrics.phase("walk"):
+                while frontier:
+                    self.hash_engine.check_cancelled()
+                    if self.checkpoint: self.checkpoint.tick(files, frontier)
+                    root, directory = frontier.pop(); between_folders = False
+                    found, subdirs = list_directory(directory, root, metrics=self.metrics, **self.filters)
+                    files.add_listing(directory, found); total_bytes += sum(st.st_size for _, st in found)
+                    if self.progress: self.progress("walk", len(files), None, total_bytes, None)
+                    frontier.extend((root, subdir) for subdir in reversed(subdirs)); between_folders = True
+        except BaseException:
+            if self.checkpoint and between_folders: self.checkpoint.save(files, frontier)
+            raise
+        self.metrics.count("files_walked", len(files)); self.metrics.count("bytes_walked", total_bytes)
+        if self.progress: self.progress("walk", len(files), None, total_bytes, None)
+        return files
+
+    def restat_files(self, files):
+        """A copy of `files` with every file stat'ed again (no file is read).
+
+        Files changed while the scan was interrupted get their new stat, so the hash index
+        doesn't hand out digests of their old contents; files that are gone, aren't regular
+        files any more or now fall outside the size filters are dropped.
+        """
+        fresh = FileTable(); min_size = self.filters.get("min_size") or 0; max_size = self.filters.get("max_size")
+        with self.metrics.phase("stat"):
+            for row in range(len(files)):
+                path = files.path(row); self.metrics.count("syscalls.stat")
+                try: st = os.stat(path, follow_symlinks=False)
+                except OSError: continue
+                if not stat.S_ISREG(st.st_mode) or st.st_size < min_size or (max_size is not None and st.st_size > max_size): continue
+                fresh.add(path, st)
+        return fresh
+
+    def open_index(self):
+        """Opens the hash index, or returns None (scan still works, just uncached)."""
+        if not self.index_path: return None
+        try:
+            with self.metrics.phase("index"): return HashIndex(self.index_path, self.hash_engine.backend)
+        except Exception as e:
+            log.warning(f"Hash index unavailable ({self.index_path}): {e}")
+            return None
+
+    def _hash_stage(self, phase, rows, files, index, stats, on_result):
+        """Hashes the files at `rows` on the hashing engine, calling on_result(row, digest) as each one is known.
+
+        The "partial" phase takes the head/tail sample (or the whole file, if the sample would
+        cover it); "full" hashes whole files. Anything the hash index already knows is not
+        re-read. Rows go to the engine HASH_CHUNK_SIZE at a time, so paths and stats only
+        exist for one chunk. Index hits are reported to progress and the checkpoint once per
+        chunk: on a rescan with nothing changed, per-row calls would cost more than the hits.
+
+        Timed as the "partial_hash" / "full_hash" phase. Files and bytes actually read are
+        counted, and so are the system calls that takes; the workers can't report those, so
+        they are worked out from each file's size and how the digest function reads it.
+        """
+        sizes = files.sizes; metrics = self.metrics
+        def read_size(row): return min(sizes[row], 2 * PARTIAL_HASH_SAMPLE_SIZE) if phase == "partial" else sizes[row]
+        def digest_func(row): return file_sample_digest if phase == "partial" and sizes[row] > 2 * PARTIAL_HASH_SAMPLE_SIZE else file_digest
+        done = [0, 0]; bytes_total = sum(map(read_size, rows))
+        def report(row, digest):
+            done[0] += 1; done[1] += read_size(row)
+            if self.checkpoint: self.checkpoint.tick(files)
+            if self.progress: self.progress(phase, done[0], len(rows), done[1], bytes_total)
+            on_result(row, digest)
+        def count_reads(row):
+            size = sizes[row]; metrics.count("syscalls.open")
+            if digest_func(row) is file_sample_digest: metrics.count("syscalls.read", 2); metrics.count("syscalls.lseek")
+            elif size and (READ_STRATEGY == "mmap" or (READ_STRATEGY == "auto" and size >= MMAP_THRESHOLD)): metrics.count("syscalls.mmap")
+            else: metrics.count("syscalls.read", size // READ_BUFFER_SIZE + 1) # the last read() finds the end of the file
+
+        with metrics.phase(f"{phase}_hash"):
+            for start in range(0, len(rows), HASH_CHUNK_SIZE):
+                chunk = [(row, files.path(row)) for row in rows[start:start + HASH_CHUNK_SIZE]]
+                if index:
+                    with metrics.phase("index"): index.prefetch(path for _, path in chunk)
+                pending = []; pending_rows = {} # path -> row for files that need reading
+                hits = 0; hit_bytes = 0
+                for row, path in chunk:
+                    func = digest_func(row)
+                    cached = index.lookup_key(path, files.key(row))[0 if func is file_sample_digest else 1] if index else None
+                    if cached: hits += 1; hit_bytes += read_size(row); on_result(row, cached)
+                    else: pending.append((func, path, files.record(row))); pending_rows[path] = row
+                if hits:
+                    stats["index_hits"] += hits; done[0] += hits; done[1] += hit_bytes
+                    if self.checkpoint: self.checkpoint.tick(files)
+                    if self.progress: self.progress(phase, done[0], len(rows), done[1], bytes_total)
+
+                def hashed(path, digest):
+                    row = pending_rows[path]
+                    count_reads(row)
+                    if digest is None: metrics.count("read_errors"); log.debug(f"Skip hash error: {path}")
+                    else: metrics.count(f"{phase}_files_read"); metrics.count(f"{phase}_bytes_read", read_size(row))
+                    if digest and index:
+                        if digest_func(row) is file_sample_digest: index.store(path, files.record(row), partial_hash=digest)
+                        else: index.store(path, files.record(row), full_hash=digest)
+                    report(row, digest)
+                self.hash_engine.run(pending, hashed)
+
+    def find_duplicates(self, files, index=None, on_group=None):
+        """Staged filtering: exact size -> hard links -> partial (head/tail) hash -> full hash.
+
+        `files` is a FileTable (or a {path: os.stat_result} dict in walk order); `index` is an
+        optional HashIndex. `on_group(digest, paths, files)` is called as soon as a group is
+        final, before the scan ends. Returns (duplicates, hardlinks, stats): `duplicates` maps
+        full hash (hex) -> [paths], one path per inode; `hardlinks` maps each of those paths to
+        its other names (deleting them frees nothing); `stats` records how many files and bytes
+        each stage ruled out.
+
+        Works on FileTable rows (walk order) and raw digests throughout; paths and hex digests
+        are only built for the files that end up in a group.
+        """
+        if not isinstance(files, FileTable): files = FileTable(files.items())
+        sizes = files.sizes
+        stats = {"files_total": len(files), "bytes_total": sum(sizes), "index_hits": 0, "digest_backend": self.hash_engine.backend}
+
+        def count(rows): return len(rows), sum(sizes[row] for row in rows)
+        def tally(stage, before, after):
+            """`before`/`after` are (files, bytes) counts of what went into and came out of a stage."""
+            stats[f"{stage}_eliminated_files"] = before[0] - after[0]
+            stats[f"{stage}_eliminated_bytes"] = before[1] - after[1]
+
+        # --- Stage 1: exact size ---
+        seen_sizes = set(); repeated_sizes = set()
+        for size in sizes: (repeated_sizes if size in seen_sizes else seen_sizes).add(size)
+        del seen_sizes
+        stage1 = array("I", (row for row in range(len(files)) if sizes[row] in repeated_sizes))
+        tally("size", (len(files), stats["bytes_total"]), count(stage1))
+
+        # --- Stage 1b: hard links ---
+        # Only one name per inode is hashed. Windows directory listings carry no inode, so
+        # the (few) files left at this point get a real stat.
+        with self.metrics.phase("stat"):
+            for row in stage1:
+                if not files.inode(row):
+                    self.metrics.count("syscalls.stat")
+                    try: files.set_stat(row, os.stat(files.path(row)))
+                    except OSError as e: log.debug(f"Error reading {files.path(row)}: {e}"); self.metrics.count("read_errors")
+        first_link = {}; hardlinks = {}
+        for row in stage1:
+            if not files.inode(row): continue # unknown inode (failed re-stat, or a file system without them): not a link
+            first = first_link.setdefault((files.device_ids[row], files.inode(row)), row)
+            if first != row: hardlinks.setdefault(first, []).append(row)
+        linked = {row for rows in hardlinks.values() for row in rows}
+        inode_sizes = {}
+        for row in stage1:
+            if row not in linked: inode_sizes.setdefault(sizes[row], []).append(row)
+        stage1b = array("I", sorted(row for rows in inode_sizes.values() if len(rows) > 1 for row in rows))
+        tally("hardlink", count(stage1), count(stage1b))
+        stats["hardlinked_files"] = len(linked)
+        del stage1, first_link, linked, inode_sizes
+
+        # Full hashes arrive in two batches (small files in stage 2, the rest in stage 3). All files
+        # of one size are fully hashed in the same batch, so a size's groups are final - and can be
+        # streamed - once its last full hash is in; its unique files are dropped right then.
+        by_full = {}; digests_by_size = {}; awaiting = {}; full_hashed = [0, 0] # files, bytes
+        def add_full_hash(row, digest):
+            size = sizes[row]; awaiting[size] -= 1
+            if digest:
+                by_full.setdefault(digest, []).append(row); digests_by_size.setdefault(size, set()).add(digest)
+                full_hashed[0] += 1; full_hashed[1] += size
+            if awaiting[size] == 0:
+                del awaiting[size]
+                for digest in digests_by_size.pop(size, ()):
+                    if len(by_full[digest]) < 2: del by_full[digest]
+                    elif on_group: on_group(digest.hex(), [files.path(member) for member in sorted(by_full[digest])], files)
+
+        # --- Stage 2: partial hash ---
+        # Files small enough to be covered by the sample are hashed in full right away.
+        by_partial = {}
+        for row in stage1b:
+            if sizes[row] <= 2 * PARTIAL_HASH_SAMPLE_SIZE: awaiting[sizes[row]] = awaiting.get(sizes[row], 0) + 1
+        def add_stage2_hash(row, digest):
+            if sizes[row] <= 2 * PARTIAL_HASH_SAMPLE_SIZE: add_full_hash(row, digest)
+            elif digest: by_partial.setdefault((sizes[row], digest), []).append(row)
+        self._hash_stage("partial", stage1b, files, index, stats, add_stage2_hash)
+
+        # --- Stage 3: full hash ---
+        stage3 = array("I", sorted(row for rows in by_partial.values() if len(rows) > 1 for row in rows))
+        del by_partial
+        stage2 = (full_hashed[0] + len(stage3), full_hashed[1] + sum(sizes[row] for row in stage3))
+        tally("partial", count(stage1b), stage2)
+        for row in stage3: awaiting[sizes[row]] = awaiting.get(sizes[row], 0) + 1
+        self._hash_stage("full", stage3, files, index, stats, add_full_hash)
+        # Groups keep the order in which their first extra copy turned up during the walk.
+        groups = sorted(((digest, sorted(rows)) for digest, rows in by_full.items()), key=lambda group: group[1][1])
+        grouped = {row for _, rows in groups for row in rows}
+        tally("full", stage2, count(grouped))
+        duplicates = {digest.hex(): [files.path(row) for row in rows] for digest, rows in groups}
+        hardlinks = {files.path(first): [files.path(row) for row in rows] for first, rows in hardlinks.items() if first in grouped}
+        return duplicates, hardlinks, stats
+
+    def find_similar_images(self, files, duplicates, hardlinks, index=None, on_group=None, stats=None):
+        """Groups images that look alike by perceptual hash; returns {key: [paths]}, in walk order.
+
+        Only the first copy of each exact duplicate group and one name per inode take part, so
+        these groups never repeat what find_duplicates() found. Keys are "~" plus the first
+        image's hash in hex; `on_group(key, paths, files)` is called per group once all images
+        are hashed. Hashes the index knows are reused; the rest are decoded on the hashing
+        engine and hashed IMAGE_BATCH_SIZE thumbnails at a time.
+        """
+        if stats is None: stats = {"index_hits": 0}
+        slot = PERCEPTUAL_HASHES.index(self.similar_hash); sizes = files.sizes
+        skip = {files.row_of(path) for paths in duplicates.values() for path in paths[1:]}
+        skip.update(files.row_of(path) for names in hardlinks.values() for path in names)
+        first_link = {}; rows = array("I")
+        for row in range(len(files)):
+            if row in skip or os.path.splitext(files.names[row])[1].lower() not in IMAGE_EXTENSIONS: continue
+            if files.inode(row) and first_link.setdefault((files.device_ids[row], files.inode(row)), row) != row: continue
+            rows.append(row)
+        del skip, first_link
+
+        hashes = {}; done = [0, 0]; bytes_total = sum(sizes[row] for row in rows)
+        def report(row):
+            done[0] += 1; done[1] += sizes[row]
+            if self.checkpoint: self.checkpoint.tick(files)
+            if self.progress: self.progress("images", done[0], len(rows), done[1], bytes_total)
+        for start in range(0, len(rows), HASH_CHUNK_SIZE):
+            chunk = [(row, files.path(row)) for row in rows[start:start + HASH_CHUNK_SIZE]]
+            if index:
+                with self.metrics.phase("index"): index.prefetch_images(path for _, path in chunk)
+            pending = []; pending_rows = {}; thumbnails = {}
+            for row, path in chunk:
+                cached = index.lookup_image(path, files.record(row)) if index else None
+                if cached is None: pending.append((image_thumbnail, path, files.record(row))); pending_rows[path] = row; continue
+                stats["index_hits"] += 1; report(row)
+                if cached: hashes[row] = unpack_hashes(cached)[slot]
+            def decoded(path, thumbnail):
+                thumbnails[path] = thumbnail; report(pending_rows[path])
+            self.hash_engine.run(pending, decoded)
+            self.metrics.count("images_read", len(pending)); self.metrics.count("syscalls.open", len(pending))
+            for batch_start in range(0, len(pending), IMAGE_BATCH_SIZE):
+                batch = [path for _, path, _ in pending[batch_start:batch_start + IMAGE_BATCH_SIZE]]
+                readable = [path for path in batch if thumbnails[path]]
+                values = dict(zip(readable, hash_thumbnails([thumbnails[path] for path in readable])))
+                for path in batch:
+                    row = pending_rows[path]
+                    if thumbnails[path] is None: log.debug(f"Skip image error: {path}"); self.metrics.count("read_errors"); continue
+                    if index: index.store_image(path, files.record(row), pack_hashes(values.get(path)))
+                    if path in values: hashes[row] = values[path][slot]
+
+        similar = {}
+        for group in group_similar({row: hashes[row] for row in sorted(hashes)}, self.similar_images):
+            key = f"~{hashes[group[0]]:016x}"; similar[key] = [files.path(row) for row in group]
+            if on_group: on_group(key, similar[key], files)
+        stats["images_compared"] = len(hashes); stats["similar_groups"] = len(similar)
+        return similar
+
+    def scan(self, folders, on_group=None, on_similar=None):
+        """Scans one folder or a list of them as a single set and returns a ScanResult.
+
+        Duplicates are found across all roots; nested or repeated roots are walked once. Raises
+        ValueError for a missing folder (or similar-image mode without Pillow) and ScanCancelled
+        if the hashing engine's cancel_event gets set; either way the scan is checkpointed first.
+        `on_similar(key, paths, files)` is called per group of similar images.
+        """
+        if isinstance(folders, (str, os.PathLike)): folders = [folders]
+        for folder in folders:
+            if not os.path.isdir(folder): raise ValueError(f"Invalid folder selected: {folder}")
+        if self.similar_images is not None and not perceptual_available(): raise ValueError("Finding similar images needs Pillow (pip install Pillow)")
+        roots = normalize_roots(folders); log.info(f"Processing: {', '.join(roots)}")
+        metrics = self.metrics = ScanMetrics(self.trace)
+        index = self.open_index(); files = None; similar = None
+        self.checkpoint = ScanCheckpoint(index, roots, self.filters, metrics=metrics) if index else None
+        try:
+            files = self.collect_files(roots)
+            with metrics.phase("grouping"): duplicates, hardlinks, stats = self.find_duplicates(files, index, on_group)
+            if self.similar_images is not None:
+                with metrics.phase("images"): similar = self.find_similar_images(files, duplicates, hardlinks, index, on_similar, stats)
+            stats["resumed_files"] = self.resumed_files
+            if index:
+                filtered = any(self.filters.get(key) for key in ("include", "exclude", "min_size")) or self.filters.get("max_size") is not None
+                with metrics.phase("index"): log.info(f"Hash index: pruned {sum(index.prune(root, files, filtered) for root in roots)} stale entries")
+            if self.checkpoint: self.checkpoint.clear()
+        except BaseException:
+            if self.checkpoint and files is not None:
+                try: self.checkpoint.save(files, [])
+                except Exception as e: log.warning(f"Could not save scan checkpoint: {e}")
+            raise
+        finally:
+            self.checkpoint = None
+            if index:
+                with metrics.phase("index"): index.commit(); index.close() # keep whatever got hashed, even if cancelled
+            metrics.finish()
+        metrics.count("index_hits", stats["index_hits"])
+        if metrics.counters.get("read_errors"): log.warning(f"{metrics.counters['read_errors']} file(s) or folder(s) could not be read (debug logging lists them)")
+        log.debug(metrics.summary())
+        return ScanResult(roots, files, duplicates, hardlinks, stats, similar, metrics)
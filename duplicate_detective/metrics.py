@@ -0,0 +1,105 @@
+"""Scan instrumentation: per-phase timers, counters, an optional trace hook and profiler, JSON reports.
+
+Cheap enough to stay on for every scan: a phase costs two perf_counter() calls, a counter a
+dict update. Messages go through the "duplicate_detective" loggers; the front ends decide
+where they end up (stderr for the CLI, the console for the GUI).
+"""
+import os
+import io
+import json
+import time
+import logging
+import platform
+import contextlib
+
+log = logging.getLogger(__name__)
+
+# --- Settings ---
+# Set these to have every scan (GUI included) write its JSON report / a cProfile dump.
+REPORT_PATH = os.environ.get("DUPLICATE_DETECTIVE_REPORT") or None
+PROFILE_PATH = os.environ.get("DUPLICATE_DETECTIVE_PROFILE") or None
+PHASES = ("walk", "stat", "partial_hash", "full_hash", "grouping", "images", "index", "checkpoint", "ui_insert")
+PHASE_LABELS = {"partial_hash": "partial hash", "full_hash": "full hash", "ui_insert": "UI insert"}
+
+class ScanMetrics:
+    """Timers and counters for one scan.
+
+    Phases nest and are timed exclusively: while "partial_hash" runs inside "grouping", the
+    clock stops for "grouping", so the phase times add up to the scan's wall time. Only the
+    scan thread may use phase(); other threads (the GUI inserting rows) use add_time().
+    `trace(event, phase, seconds)` is called as each phase starts ("start", 0) and ends
+    ("end", seconds spent in that run, nested phases included).
+    """
+    def __init__(self, trace=None):
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.counters = {}
+        self.trace = trace
+        self.started = time.perf_counter(); self.finished = None
+        self._stack = [] # [phase, running since] of the phases in progress, innermost last
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        now = time.perf_counter()
+        if self._stack: parent = self._stack[-1]; self.timings[parent[0]] += now - parent[1]
+        self._stack.append([name, now]); entered = now
+        if self.trace: self.trace("start", name, 0.0)
+        try: yield
+        finally:
+            now = time.perf_counter(); name, since = self._stack.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + now - since
+            if self._stack: self._stack[-1][1] = now
+            if self.trace: self.trace("end", name, now - entered)
+
+    def add_time(self, name, seconds, parent=None):
+        """Books `seconds` to `name`; with `parent` (the running phase they were measured in) they are taken off it."""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        if parent: self.timings[parent] -= seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def report(self, **extra):
+        """Everything measured, as a JSON-ready dict (plus `extra` keys, e.g. roots or stage stats)."""
+        wall = (self.finished or time.perf_counter()) - self.started
+        counters = self.counters; hashed = counters.get("partial_bytes_read", 0) + counters.get("full_bytes_read", 0)
+        hash_seconds = self.timings["partial_hash"] + self.timings["full_hash"]
+        walk_seconds = self.timings["walk"] + self.timings["stat"]
+        return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "platform": platform.platform(),
+                "wall_seconds": round(wall, 4), "phases": {name: round(seconds, 4) for name, seconds in self.timings.items()},
+                "counters": {name: value for name, value in counters.items() if not name.startswith("syscalls.")},
+                "syscalls": {name[len("syscalls."):]: value for name, value in counters.items() if name.startswith("syscalls.")},
+                "throughput": {"files_per_second": round(counters.get("files_walked", 0) / wall, 1) if wall else None,
+                               "walk_files_per_second": round(counters.get("files_walked", 0) / walk_seconds, 1) if walk_seconds else None,
+                               "hash_bytes_per_second": round(hashed / hash_seconds) if hash_seconds else None},
+                **extra}
+
+    def summary(self):
+        """One line: where the time went."""
+        wall = (self.finished or time.perf_counter()) - self.started
+        parts = [f"{PHASE_LABELS.get(name, name)} {seconds:.2f} s" for name, seconds in self.timings.items() if seconds >= 0.005]
+        files = self.counters.get("files_walked", 0)
+        return f"Timings: {' · '.join(parts) or 'none'} · total {wall:.2f} s ({files / wall if wall else 0:,.0f} files/s)"
+
+def write_report(path, reports):
+    """Writes one scan's report (a dict) or several (a list) to `path` as JSON."""
+    with open(path, "w", encoding="utf-8") as f: json.dump(reports, f, indent=2)
+    log.info(f"Scan report written to {path}")
+
+@contextlib.contextmanager
+def profiled(path=None, top=25):
+    """Runs the block under cProfile (the calling thread only) when `path` is set.
+
+    The stats are saved to `path` (open them with pstats or snakeviz) and the `top` functions by
+    cumulative time are logged at DEBUG level.
+    """
+    if not path: yield; return
+    import cProfile, pstats
+    profiler = cProfile.Profile(); profiler.enable()
+    try: yield
+    finally:
+        profiler.disable(); profiler.dump_stats(path)
+        text = io.StringIO(); pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+        log.debug(text.getvalue()); log.info(f"Profile written to {path}")
@@ -0,0 +1,158 @@
+"""Near-duplicate images: perceptual hashes (aHash, dHash, pHash) and Hamming-distance grouping.
+
+Needs Pillow (pip install Pillow); numpy is optional and hashes a batch of thumbnails in a few
+array operations instead of one image at a time. Neither is imported until images are hashed.
+"""
+import math
+import importlib.util
+
+# --- Settings ---
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".tif", ".tiff", ".tga", ".dds"}
+PERCEPTUAL_HASHES = ("ahash", "dhash", "phash")
+NEAR_DUPLICATE_HASH = "phash" # Most robust to re-encoding, resizing and small edits
+NEAR_DUPLICATE_THRESHOLD = 8 # Max differing bits (of 64) for two images to count as near-duplicates
+IMAGE_BATCH_SIZE = 256 # Thumbnails hashed together
+PERCEPTUAL_VERSION = "2" # Bump when the thumbnails or the hash math change; cached hashes get dropped
+THUMBNAIL_SIZE = 32 # pHash works on a 32x32 grayscale thumbnail; aHash averages it down to 8x8
+PHASH_STEPS = 16 # pHash coefficients are rounded to 1/16 before they meet the median (see _quantize)
+
+def available():
+    """True if Pillow is installed (the near-duplicate mode can run)."""
+    return importlib.util.find_spec("PIL") is not None
+
+# --- Decoding ---
+def image_thumbnail(file_path, file_size=None, backend=None):
+    """Decodes an image straight into the grayscale thumbnails the hashes need.
+
+    Returns 32x32 pixels followed by 9x8 pixels (for dHash) as bytes, b"" if the file isn't an
+    image Pillow can decode, or None if it can't be read right now (worth trying again next scan).
+    Same signature as the digest functions, so it runs on the HashingEngine.
+    JPEGs are decoded at reduced scale from the DCT data (draft), other formats get a cheap box
+    reduce() before the final resize, so big images are never decoded at full size twice.
+    """
+    from PIL import Image
+    try:
+        with Image.open(file_path) as image:
+            image.draft("L", (2 * THUMBNAIL_SIZE, 2 * THUMBNAIL_SIZE))
+            image = image.convert("L")
+            factor = min(image.width, image.height) // (2 * THUMBNAIL_SIZE)
+            if factor > 1: image = image.reduce(factor)
+            return (image.resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS).tobytes()
+                    + image.resize((9, 8), Image.Resampling.LANCZOS).tobytes())
+    except (FileNotFoundError, PermissionError):
+        return None
+    except Exception:
+        return b""
+
+# --- Hashing ---
+# DCT-II basis for the 8 lowest frequencies of a 32-point signal (unnormalised: every coefficient
+# gets the same scale, which doesn't change how they compare to their median).
+_DCT = [[math.cos(math.pi * (2 * n + 1) * k / (2 * THUMBNAIL_SIZE)) for n in range(THUMBNAIL_SIZE)] for k in range(8)]
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits: value = (value << 1) | bool(bit)
+    return value
+
+def _quantize(coefficient):
+    """Rounds a DCT coefficient to 1/PHASH_STEPS.
+
+    Flat or symmetric thumbnails have coefficients that are exactly zero; computed, they come out
+    as floating-point noise whose sign depends on the order of the additions (numpy's isn't
+    Python's). Rounded, they are zero on both paths and the hash bits are the same.
+    """
+    return round(coefficient * PHASH_STEPS)
+
+def _hash_one(thumbnail):
+    """(ahash, dhash, phash) of one thumbnail, in plain Python."""
+    big = thumbnail[:THUMBNAIL_SIZE * THUMBNAIL_SIZE]; small = thumbnail[THUMBNAIL_SIZE * THUMBNAIL_SIZE:]
+    blocks = [sum(big[(4 * by + y) * THUMBNAIL_SIZE + 4 * bx + x] for y in range(4) for x in range(4)) for by in range(8) for bx in range(8)]
+    mean = sum(blocks) / 64
+    ahash = _bits_to_int(block > mean for block in blocks)
+    dhash = _bits_to_int(small[9 * row + column + 1] > small[9 * row + column] for row in range(8) for column in range(8))
+    rows = [[sum(basis[x] * big[y * THUMBNAIL_SIZE + x] for x in range(THUMBNAIL_SIZE)) for basis in _DCT] for y in range(THUMBNAIL_SIZE)]
+    low = [_quantize(sum(_DCT[v][y] * rows[y][u] for y in range(THUMBNAIL_SIZE))) for v in range(8) for u in range(8)]
+    ordered = sorted(low); median = (ordered[31] + ordered[32]) / 2
+    return ahash, dhash, _bits_to_int(coefficient > median for coefficient in low)
+
+def _hash_batch(numpy, thumbnails):
+    """(ahash, dhash, phash) for a batch of thumbnails, vectorised over the whole batch."""
+    count = len(thumbnails); side = THUMBNAIL_SIZE
+    pixels = numpy.frombuffer(b"".join(thumbnails), dtype=numpy.uint8).reshape(count, side * side + 72).astype(numpy.float64)
+    big = pixels[:, :side * side].reshape(count, side, side); small = pixels[:, side * side:].reshape(count, 8, 9)
+    blocks = big.reshape(count, 8, side // 8, 8, side // 8).mean(axis=(2, 4)).reshape(count, 64)
+    ahash = blocks > blocks.mean(axis=1, keepdims=True)
+    dhash = (small[:, :, 1:] > small[:, :, :-1]).reshape(count, 64)
+    dct = numpy.array(_DCT)
+    low = numpy.rint((dct @ big @ dct.T).reshape(count, 64) * PHASH_STEPS) # same rounding (half to even) as _quantize
+    phash = low > numpy.median(low, axis=1, keepdims=True)
+    packed = [numpy.packbits(bits, axis=1).view(">u8").ravel().tolist() for bits in (ahash, dhash, phash)]
+    return list(zip(*packed))
+
+def hash_thumbnails(thumbnails):
+    """(ahash, dhash, phash) as 64-bit ints for each thumbnail from image_thumbnail()."""
+    if not thumbnails: return []
+    try: import numpy
+    except ImportError: return [_hash_one(thumbnail) for thumbnail in thumbnails]
+    return _hash_batch(numpy, thumbnails)
+
+def pack_hashes(hashes):
+    """(ahash, dhash, phash) -> 24 bytes for the hash index; None (not an image) -> b""."""
+    return b"".join(value.to_bytes(8, "big") for value in hashes) if hashes else b""
+
+def unpack_hashes(blob):
+    return tuple(int.from_bytes(blob[i:i + 8], "big") for i in range(0, 24, 8)) if blob else None
+
+# --- Grouping ---
+_popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))
+
+class HammingIndex:
+    """64-bit hashes, searchable by Hamming distance without comparing every pair.
+
+    Multi-index hashing: each hash is cut into `blocks` pieces and every piece gets its own
+    lookup table. Two hashes at most `threshold` bits apart differ in at most threshold // blocks
+    bits of some piece (pigeonhole), so a query probes only the table keys that close to its
+    own pieces and checks just those candidates in full.
+    """
+    def __init__(self, threshold, blocks=4):
+        self.threshold = threshold; self.blocks = blocks
+        self.width = 64 // blocks; self.mask = (1 << self.width) - 1
+        self.tables = [{} for _ in range(blocks)]
+        radius = threshold // blocks
+        self.flips = [0] # every mask of up to `radius` bits within a piece
+        for _ in range(radius): self.flips = sorted({flip | (1 << bit) for flip in self.flips for bit in range(self.width)} | set(self.flips))
+
+    def _pieces(self, value):
+        return [(value >> (self.width * i)) & self.mask for i in range(self.blocks)]
+
+    def add(self, value):
+        for table, piece in zip(self.tables, self._pieces(value)): table.setdefault(piece, []).append(value)
+
+    def query(self, value):
+        """Stored hashes within `threshold` bits of `value`."""
+        found = set()
+        for table, piece in zip(self.tables, self._pieces(value)):
+            for flip in self.flips:
+                for other in table.get(piece ^ flip, ()):
+                    if _popcount(other ^ value) <= self.threshold: found.add(other)
+        return found
+
+def group_similar(hashes, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Groups items whose hashes are at most `threshold` bits apart.
+
+    `hashes` maps item -> 64-bit hash (in the order items should be listed). Returns a list of
+    groups of 2+ items: connected components, so A~B and B~C put A, B and C together.
+    """
+    by_value = {}
+    for item, value in hashes.items(): by_value.setdefault(value, []).append(item)
+    parent = {value: value for value in by_value}
+    def find(value):
+        while parent[value] != value: parent[value] = parent[parent[value]]; value = parent[value]
+        return value
+    index = HammingIndex(threshold)
+    for value in by_value:
+        for other in index.query(value): parent[find(other)] = find(value)
+        index.add(value)
+    components = {}
+    for item, value in hashes.items(): components.setdefault(find(value), []).append(item)
+    return [items for items in components.values() if len(items) > 1]
@@ -0,0 +1,203 @@
+"""Reclaiming space from duplicates: delete, quarantine, trash, or replace with hard links / reflinks.
+
+Every file is re-checked against its duplicate group right before it is touched, and every
+change is written to an undo journal (JSON Lines) that undo_journal() can reverse. Entries
+with no digest come from a group of similar images: they are checked by size only, and can't
+be replaced with links or re-created from the kept image.
+"""
+import os
+import sys
+import json
+import time
+import errno
+import logging
+import shutil
+import itertools
+import threading
+
+from .engine import DIGEST_BACKEND, hash_file
+
+try: import send2trash # pip install Send2Trash (optional, enables the "trash" action)
+except ImportError: send2trash = None
+
+log = logging.getLogger(__name__)
+
+# --- Settings ---
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".duplicate_detective")
+DEFAULT_JOURNAL_DIR = os.path.join(DATA_DIR, "journal")
+DEFAULT_QUARANTINE_DIR = os.path.join(DATA_DIR, "quarantine")
+RECLAIM_BATCH_SIZE = 200 # Files per progress report
+ACTIONS = ("delete", "quarantine", "hardlink", "reflink") + (("trash",) if send2trash else ())
+
+class VerificationError(Exception):
+    """The file on disk no longer matches its duplicate group, so it was left alone."""
+
+_temp_counter = itertools.count()
+
+def _temp_path(path):
+    """A hidden sibling of `path` (same folder, so os.replace() stays on one filesystem)."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.dd-{os.getpid()}-{next(_temp_counter)}.tmp")
+
+def reflink(src, dst):
+    """Creates `dst` as a copy-on-write clone of `src` (Btrfs/XFS on Linux, APFS on macOS)."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        FICLONE = 0x40049409
+        with open(src, "rb") as source, open(dst, "xb") as target:
+            try: fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            except OSError: target.close(); os.remove(dst); raise
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            error = ctypes.get_errno(); raise OSError(error, os.strerror(error), dst)
+    else: raise OSError(errno.EOPNOTSUPP, "Reflinks are not supported on this system", dst)
+
+def _replace_with(path, make_copy):
+    """Swaps `path` for a new file created by make_copy(temp_path), keeping the old one until the swap."""
+    temp = _temp_path(path)
+    try:
+        make_copy(temp)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.lexists(temp): os.remove(temp)
+        raise
+
+class Reclaimer:
+    """Applies delete-plan entries (see engine.plan_group) one by one, verifying and journaling each.
+
+    Use as a context manager (closes the journal), then call apply() per entry or run() for a
+    whole plan in batches. The journal is only created once a file has been changed, so a run
+    that changed nothing leaves none behind (`changed` counts the files it holds).
+    """
+    def __init__(self, action="delete", backend=DIGEST_BACKEND, journal_dir=DEFAULT_JOURNAL_DIR, quarantine_dir=DEFAULT_QUARANTINE_DIR,
+                 verify_content=True, cancel_event=None, batch_size=RECLAIM_BATCH_SIZE):
+        if action not in ACTIONS: raise ValueError(f"Unknown action '{action}' (available: {', '.join(ACTIONS)})")
+        self.action = action; self.backend = backend
+        self.verify_content = verify_content
+        self.cancel_event = cancel_event or threading.Event()
+        self.batch_size = batch_size
+        now = time.time() # unique per run: runs in the same second get their own journal and quarantine folder
+        run_name = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now % 1 * 1e6):06d}-{os.getpid()}-{action}"
+        self.journal_path = os.path.join(journal_dir, run_name + ".jsonl")
+        self.quarantine_dir = os.path.join(quarantine_dir, run_name)
+        self.journal = None; self.changed = 0
+        self.kept = {} # (keep path, digest) -> stat result (or the VerificationError it failed with)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.journal: self.journal.close()
+
+    def _log_change(self, record):
+        if not self.journal:
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            self.journal = open(self.journal_path, "x", encoding="utf-8")
+        self.journal.write(json.dumps(record, ensure_ascii=False) + "\n"); self.changed += 1
+
+    def verify(self, path, size, digest):
+        """Stat (and by default re-hash) `path`; raises VerificationError unless it still matches.
+
+        A `size` or `digest` of None skips that check.
+        """
+        try: st = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError: raise VerificationError(f"{path} no longer exists")
+        if not os.path.isfile(path) or os.path.islink(path): raise VerificationError(f"{path} is no longer a regular file")
+        if size is not None and st.st_size != size: raise VerificationError(f"{path} changed size since the scan")
+        if self.verify_content and digest is not None and hash_file(path, size, self.backend) != digest: raise VerificationError(f"{path} changed contents since the scan")
+        return st
+
+    def _quarantine_path(self, path):
+        drive, rest = os.path.splitdrive(os.path.abspath(path))
+        return os.path.join(self.quarantine_dir, drive.strip(":\\/").replace(":", ""), rest.lstrip("\\/"))
+
+    def apply(self, entry):
+        """Applies one plan entry and returns the bytes it freed. Raises VerificationError or OSError.
+
+        A file with other hard-link names frees nothing: its data stays on disk under them.
+        """
+        path, keep, size, digest = entry["path"], entry["keep"], entry["size"], entry["digest"]
+        if digest is None and self.action in ("hardlink", "reflink"): raise VerificationError(f"{path} only looks like {keep}, it can't be replaced with a link to it")
+        if (keep, digest) not in self.kept:
+            try: self.kept[keep, digest] = self.verify(keep, size if digest else None, digest)
+            except VerificationError as e: self.kept[keep, digest] = e
+        kept = self.kept[keep, digest]
+        if isinstance(kept, VerificationError): raise VerificationError(f"kept copy: {kept}")
+        st = self.verify(path, size, digest)
+        if (st.st_dev, st.st_ino) == (kept.st_dev, kept.st_ino): raise VerificationError(f"{path} is already a hard link to {keep}")
+
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "action": self.action, "path": path, "keep": keep,
+                  "size": size, "digest": digest, "backend": self.backend, "mtime_ns": st.st_mtime_ns}
+        if self.action == "delete": os.remove(path)
+        elif self.action == "trash": send2trash.send2trash(path)
+        elif self.action == "quarantine":
+            record["moved_to"] = self._quarantine_path(path)
+            os.makedirs(os.path.dirname(record["moved_to"]), exist_ok=True); shutil.move(path, record["moved_to"])
+        elif self.action == "hardlink": _replace_with(path, lambda temp: os.link(keep, temp))
+        elif self.action == "reflink":
+            def clone(temp): reflink(keep, temp); shutil.copystat(path, temp)
+            _replace_with(path, clone)
+        self._log_change(record)
+        if st.st_nlink > 1:
+            log.warning(f"{path} has {st.st_nlink - 1} other hard link(s); its data stays on disk until they are removed too")
+            return 0
+        return size
+
+    def run(self, plan, progress=None):
+        """Applies a whole plan; stops early if cancel_event is set. Returns the bytes freed.
+
+        progress(done, total, bytes_freed, batch) is called every batch_size files, with batch
+        being [(entry, error message or None)] for the files handled since the last call.
+        """
+        batch = []; freed = 0; done = 0
+        for entry in plan:
+            if self.cancel_event.is_set(): break
+            try: freed += self.apply(entry); batch.append((entry, None))
+            except (OSError, VerificationError) as e: log.warning(f"Skipped {entry['path']}: {e}"); batch.append((entry, str(e)))
+            done += 1
+            if len(batch) >= self.batch_size:
+                if self.journal: self.journal.flush()
+                if progress: progress(done, len(plan), freed, batch)
+                batch = []
+        if self.journal: self.journal.flush()
+        if progress: progress(done, len(plan), freed, batch)
+        return freed
+
+# --- Undo ---
+def latest_journal(journal_dir=DEFAULT_JOURNAL_DIR):
+    """Path of the most recently written journal that hasn't been undone yet, or None."""
+    try: paths = [entry.path for entry in os.scandir(journal_dir) if entry.name.endswith(".jsonl") and not entry.name.endswith(".undone.jsonl")]
+    except FileNotFoundError: return None
+    return max(paths, key=lambda path: (os.stat(path).st_mtime_ns, path)) if paths else None
+
+def undo_journal(journal_path, verify_content=True):
+    """Reverses a journal, newest change first. Returns (restored, errors).
+
+    Quarantined files are moved back. Deleted and linked files are re-created as independent
+    copies of the kept file (same contents, that's what the journal verified), with their old
+    modification time; a deleted similar image can't be, it only looked like the kept one.
+    Trashed files have to be restored from the system trash.
+    """
+    with open(journal_path, encoding="utf-8") as f: records = [json.loads(line) for line in f if line.strip()]
+    restored = 0; errors = []
+    for record in reversed(records):
+        path = record["path"]
+        try:
+            if record["action"] == "trash": raise OSError(f"restore {path} from the system trash")
+            if record["action"] == "quarantine":
+                if os.path.lexists(path): raise OSError(f"{path} exists again, left the quarantined copy at {record['moved_to']}")
+                os.makedirs(os.path.dirname(path), exist_ok=True); shutil.move(record["moved_to"], path)
+            else:
+                if record["action"] == "delete" and os.path.lexists(path): raise OSError(f"{path} exists again")
+                if record["digest"] is None: raise OSError(f"{path} was a similar image, not a copy of {record['keep']}; it can't be re-created")
+                if verify_content and hash_file(record["keep"], backend=record["backend"]) != record["digest"]:
+                    raise OSError(f"kept copy {record['keep']} changed, can't restore {path} from it")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _replace_with(path, lambda temp: shutil.copyfile(record["keep"], temp))
+                os.utime(path, ns=(record["mtime_ns"], record["mtime_ns"]))
+            restored += 1
+        except OSError as e: log.warning(f"Undo failed for {path}: {e}"); errors.append(str(e))
+    os.replace(journal_path, journal_path[:-len(".jsonl")] + ".undone.jsonl")
+    return restored, errors
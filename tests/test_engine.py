@@ -0,0 +1,36 @@
+"""Scan engine regressions. Run with `python -m unittest` (or pytest) from the repository root."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from duplicate_detective.engine import DuplicateScanner, HashIndex, HashingEngine
+
+class HashIndexPathsTest(unittest.TestCase):
+    def setUp(self):
+        self.work = tempfile.mkdtemp(); self.addCleanup(shutil.rmtree, self.work, True)
+        self.tree = os.path.join(self.work, "tree"); os.mkdir(self.tree)
+
+    def scan(self, index_path):
+        engine = HashingEngine(workers=1)
+        try: return DuplicateScanner(engine, index_path).scan(self.tree)
+        finally: engine.shutdown()
+
+    def test_non_utf8_name(self):
+        """A file name that isn't valid UTF-8 (a str with lone surrogates) is scanned, indexed and found again."""
+        try:
+            with open(os.path.join(os.fsencode(self.tree), b"bad\xffname.bin"), "wb") as f: f.write(b"x" * 5000)
+        except (OSError, UnicodeError): self.skipTest("file system only takes UTF-8 names")
+        with open(os.path.join(self.tree, "good.bin"), "wb") as f: f.write(b"x" * 5000)
+        bad = os.path.join(self.tree, os.fsdecode(b"bad\xffname.bin"))
+        index_path = os.path.join(self.work, "index.sqlite3")
+        for _ in range(2): # the second scan reads the digests back from the index
+            result = self.scan(index_path)
+            self.assertEqual([sorted(paths) for paths in result.duplicates.values()], [sorted([bad, os.path.join(self.tree, "good.bin")])])
+        self.assertEqual(result.stats["index_hits"], 2)
+        index = HashIndex(index_path)
+        try: self.assertEqual(index.prune(self.tree, {bad}), 1) # only good.bin is unseen
+        finally: index.close()
+
+if __name__ == "__main__":
+    unittest.main()
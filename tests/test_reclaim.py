@@ -0,0 +1,63 @@
+"""Reclaimer regressions. Run with `python -m unittest` (or pytest) from the repository root."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from duplicate_detective.engine import DuplicateScanner, HashingEngine, plan_deletion, reclaimable_bytes
+from duplicate_detective.reclaim import Reclaimer, latest_journal, undo_journal
+
+class ReclaimTestCase(unittest.TestCase):
+    """A tree with a.bin and its copy bb.bin."""
+    def setUp(self):
+        self.work = tempfile.mkdtemp(); self.addCleanup(shutil.rmtree, self.work, True)
+        self.tree = os.path.join(self.work, "tree"); os.mkdir(self.tree)
+        for name in ("a.bin", "bb.bin"): # a.bin is kept (keep="shortest-path")
+            with open(self.path(name), "wb") as f: f.write(b"x" * 50000)
+
+    def path(self, name):
+        return os.path.join(self.tree, name)
+
+    def scan(self):
+        engine = HashingEngine(workers=1)
+        try: return DuplicateScanner(engine, None).scan(self.tree)
+        finally: engine.shutdown()
+
+    def reclaimer(self, action="delete"):
+        return Reclaimer(action, journal_dir=os.path.join(self.work, "journal"), quarantine_dir=os.path.join(self.work, "quarantine"))
+
+class HardLinkTest(ReclaimTestCase):
+    def reclaim(self, plan):
+        with self.reclaimer() as reclaimer: return reclaimer.run(plan)
+
+    def test_plain_copy_frees_its_size(self):
+        result = self.scan(); plan = plan_deletion(result.duplicates, result.files, "shortest-path")
+        self.assertEqual(reclaimable_bytes(plan, result.hardlinks), 50000)
+        self.assertEqual(self.reclaim(plan), 50000)
+
+    def test_copy_with_another_hard_link_frees_nothing(self):
+        """Deleting bb.bin leaves its data on disk under its other name, so nothing is reclaimed."""
+        try: os.link(self.path("bb.bin"), self.path("cc.bin"))
+        except OSError: self.skipTest("file system has no hard links")
+        result = self.scan(); plan = plan_deletion(result.duplicates, result.files, "shortest-path")
+        names = {self.path("bb.bin"), self.path("cc.bin")} # whichever was walked first stands for both
+        self.assertEqual(len(plan), 1); self.assertIn(plan[0]["path"], names)
+        self.assertEqual(reclaimable_bytes(plan, result.hardlinks), 0)
+        with self.assertLogs("duplicate_detective.reclaim", "WARNING"): self.assertEqual(self.reclaim(plan), 0)
+        self.assertEqual([os.path.exists(path) for path in sorted(names)], [path != plan[0]["path"] for path in sorted(names)])
+
+class JournalTest(ReclaimTestCase):
+    def test_run_that_changed_nothing_leaves_no_journal(self):
+        """The latest journal is the last run that changed something, even a run earlier in the same second."""
+        result = self.scan(); plan = plan_deletion(result.duplicates, result.files, "shortest-path")
+        with self.reclaimer("quarantine") as reclaimer: self.assertEqual(reclaimer.run(plan), 50000)
+        failing = [dict(entry, keep=self.path("gone.bin")) for entry in plan] # every file fails verification
+        with self.reclaimer("delete") as empty: empty.run(failing)
+        self.assertNotEqual(empty.journal_path, reclaimer.journal_path); self.assertNotEqual(empty.quarantine_dir, reclaimer.quarantine_dir)
+        self.assertEqual(empty.changed, 0); self.assertFalse(os.path.exists(empty.journal_path))
+        self.assertEqual(latest_journal(os.path.join(self.work, "journal")), reclaimer.journal_path)
+        self.assertEqual(undo_journal(reclaimer.journal_path), (1, []))
+        self.assertTrue(os.path.exists(self.path("bb.bin")))
+
+if __name__ == "__main__":
+    unittest.main()